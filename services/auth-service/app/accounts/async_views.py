@@ -0,0 +1,292 @@
+"""
+ASGI versions of the register / login / OTP endpoints.
+
+Served instead of the APIView classes in views.py when ASYNC_AUTH_VIEWS is
+on. Redis goes through redis.asyncio, password hashing through the hashing
+pool and user lookups through the async ORM, so a single event loop can keep
+many OTP flows in flight. Work that must stay sync (serializer checks that
+query the DB, multi-statement writes, the occasional Celery publish) runs in
+a thread.
+"""
+import json
+import uuid
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import serializers, status
+from rest_framework.exceptions import ParseError, Throttled
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+from .serializers import (
+    RegistrationSerializer,
+    VerifyOTPSerializer,
+    LoginCredentialsSerializer,
+    VerifyLoginOTPSerializer,
+)
+from .mail import aqueue_otp_email
+from .utils import generate_otp
+from .uploads import ExperienceProofUploadHandler, discard_upload, keep_upload
+from .models import User
+from .services import registration_payload
+from .otp_service import (
+    OTP_EXPIRED,
+    OTP_VERIFIED,
+    MESSAGES,
+    astore_register_challenge,
+    averify_register_challenge,
+    astore_login_challenge,
+    averify_login_challenge,
+)
+from .authentication import (
+    aget_user_version,
+    aread_login_claims,
+    login_context,
+    read_login_context,
+    snapshot_user,
+)
+from .jwt import generate_tokens
+from .hashing import amake_password, acheck_password
+from .registration import PENDING, aqueue_finalization
+from .throttling import (
+    REGISTER_THROTTLES,
+    LOGIN_THROTTLES,
+    VERIFY_OTP_THROTTLES,
+    VERIFY_LOGIN_OTP_THROTTLES,
+)
+
+
+def credentials_error(message):
+    return serializers.ValidationError(
+        {api_settings.NON_FIELD_ERRORS_KEY: [message]}
+    )
+
+
+class AsyncAPIView(View):
+    """
+    Just enough of APIView for AllowAny JSON endpoints: body parsing into
+    request.data, the Redis throttles and DRF's exception handling, without
+    leaving the loop.
+    """
+
+    throttle_classes = []
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.data = self.parse(request)
+            await self.check_throttles(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except Exception as exc:
+            response = exception_handler(exc, {"request": request, "view": self})
+            if response is None:
+                raise
+            return self.render_error(response)
+
+    async def check_throttles(self, request):
+        waits = []
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not await throttle.aallow_request(request, self):
+                waits.append(throttle.wait())
+        if waits:
+            self.throttled(request, max(waits))
+
+    def throttled(self, request, wait):
+        raise Throttled(wait)
+
+    def parse(self, request):
+        if request.content_type == "application/json":
+            try:
+                return json.loads(request.body or b"{}")
+            except ValueError as exc:
+                raise ParseError(f"JSON parse error - {exc}")
+
+        data = request.POST.copy()
+        data.update(request.FILES)
+        return data
+
+    def render_error(self, response):
+        rendered = JsonResponse(response.data, status=response.status_code, safe=False)
+        for header, value in response.headers.items():
+            if header.lower() != "content-type":
+                rendered[header] = value
+        return rendered
+
+
+class RegisterAPIView(AsyncAPIView):
+    throttle_classes = REGISTER_THROTTLES
+
+    async def dispatch(self, request, *args, **kwargs):
+        # mentor proofs are streamed to their final location while parsing
+        request.upload_handlers.insert(0, ExperienceProofUploadHandler(request))
+        return await super().dispatch(request, *args, **kwargs)
+
+    def throttled(self, request, wait):
+        discard_upload(request.data.get("experience_proof"))
+        super().throttled(request, wait)
+
+    async def post(self, request):
+        serializer = RegistrationSerializer(data=request.data)
+
+        try:
+            # field checks run exists() queries and the password validators
+            await sync_to_async(serializer.is_valid)(raise_exception=True)
+            data = serializer.validated_data
+
+            if data["role"] != User.Role.MENTOR:
+                discard_upload(data.get("experience_proof"))
+            else:
+                # takes its reference in the database
+                await sync_to_async(keep_upload)(data.get("experience_proof"))
+
+            otp = generate_otp()
+            otp_id = str(uuid.uuid4())
+
+            payload = registration_payload(
+                data, await amake_password(data["password"])
+            )
+
+            await astore_register_challenge(otp_id, otp, payload)
+        except Exception:
+            # no pending registration references the streamed proof
+            await sync_to_async(discard_upload)(request.data.get("experience_proof"))
+            raise
+
+        await aqueue_otp_email(data["email"], otp)
+
+        return JsonResponse(
+            {"otp_id": otp_id, "message": "OTP sent"},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class VerifyOTPAPIView(AsyncAPIView):
+    throttle_classes = VERIFY_OTP_THROTTLES
+
+    async def post(self, request):
+        serializer = VerifyOTPSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        otp_id = serializer.validated_data["otp_id"]
+        otp = serializer.validated_data["otp"]
+
+        result, data = await averify_register_challenge(otp_id, otp)
+
+        if result == OTP_EXPIRED:
+            return JsonResponse({"error": "OTP expired"}, status=400)
+
+        if result != OTP_VERIFIED:
+            return JsonResponse({"error": MESSAGES[result]}, status=400)
+
+        await aqueue_finalization(otp_id, data)
+
+        status_url = request.build_absolute_uri(
+            reverse("registration-status", args=[otp_id])
+        )
+        response = JsonResponse(
+            {"status": PENDING, "status_url": status_url},
+            status=status.HTTP_202_ACCEPTED,
+        )
+        response["Location"] = status_url
+        return response
+
+
+class LoginAPIView(AsyncAPIView):
+    throttle_classes = LOGIN_THROTTLES
+
+    async def post(self, request):
+        serializer = LoginCredentialsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        credentials = serializer.validated_data
+
+        try:
+            user = await User.objects.aget(email=credentials["email"])
+        except User.DoesNotExist:
+            raise credentials_error("Invalid credentials")
+
+        if not await acheck_password(user, credentials["password"]):
+            raise credentials_error("Invalid credentials")
+
+        # version first, then the claims the snapshot carries
+        version = await aread_login_claims(user)
+        if not user.is_active:
+            raise credentials_error("User inactive")
+
+        if user.role == User.Role.MENTOR and not user.is_approved:
+            return JsonResponse(
+                {"detail": "Mentor account not approved yet"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        otp = generate_otp()
+        challenge_id = str(uuid.uuid4())
+
+        await astore_login_challenge(
+            challenge_id, otp, login_context(user, version)
+        )
+
+        await aqueue_otp_email(user.email, otp, login=True)
+
+        response = JsonResponse({"otp_required": True}, status=status.HTTP_200_OK)
+        response.set_cookie(
+            key="challenge_id",
+            value=challenge_id,
+            httponly=True,
+            secure=False,  # True in production (HTTPS)
+            samesite="Lax",
+            max_age=300,
+        )
+
+        return response
+
+
+class VerifyLoginOTPAPIView(AsyncAPIView):
+    throttle_classes = VERIFY_LOGIN_OTP_THROTTLES
+
+    async def post(self, request):
+        serializer = VerifyLoginOTPSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        otp = serializer.validated_data["otp"]
+
+        challenge_id = request.COOKIES.get("challenge_id")
+        if not challenge_id:
+            return JsonResponse({"detail": "Login expired"}, status=400)
+
+        result, context = await averify_login_challenge(challenge_id, otp)
+
+        if result == OTP_EXPIRED:
+            return JsonResponse({"detail": "Login expired"}, status=400)
+
+        if result != OTP_VERIFIED:
+            return JsonResponse({"detail": MESSAGES[result]}, status=400)
+
+        user_id, snapshot = read_login_context(context)
+        version = await aget_user_version(user_id)
+        # minted from the snapshot taken at login while its version is current
+        user = snapshot_user(user_id, snapshot, version)
+        if user is None:
+            # role, approval or active changed since login; the row decides
+            user = await User.objects.filter(pk=user_id).afirst()
+            if user is None or not user.is_active:
+                return JsonResponse({"detail": "User inactive"}, status=400)
+
+        if user.role == User.Role.MENTOR and not user.is_approved:
+            return JsonResponse(
+                {"detail": "Mentor account not approved yet"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        # starts the token family in Redis
+        tokens = await sync_to_async(generate_tokens)(user, version)
+
+        response = JsonResponse({**tokens, "role": user.role}, status=status.HTTP_200_OK)
+        response.delete_cookie("challenge_id")
+
+        return response
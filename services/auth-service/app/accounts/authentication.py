@@ -0,0 +1,271 @@
+"""
+JWT authentication without a User query per request.
+
+Access tokens carry the fields the permission classes look at (role,
+approval, staff) plus the user's version number. Reading user:ver:<id>
+confirms the claims are still current; when a user's role, approval, staff
+or active flag changes the version is dropped, and tokens minted before
+that fall back to the database (through a small per-process cache) until
+the user logs in again.
+
+A missing version (dropped, flushed or evicted) is replaced with a random
+one, so it matches no token minted before. Callers read the version before
+the User row: a change that commits in between then leaves the token stale
+rather than current.
+"""
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from redis.exceptions import RedisError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .models import User
+from .redis_client import redis_client, async_redis_client
+
+USER_VERSION_KEY = "user:ver:{}"
+
+
+# ---------- versions ----------
+
+def new_user_version():
+    return secrets.randbits(48)
+
+
+def add_version_read(pipe, user_id):
+    key = USER_VERSION_KEY.format(user_id)
+    pipe.set(key, new_user_version(), nx=True)
+    pipe.get(key)
+
+
+def get_user_version(user_id):
+    with redis_client.pipeline(transaction=False) as pipe:
+        add_version_read(pipe, user_id)
+        return int(pipe.execute()[1])
+
+
+async def aget_user_version(user_id):
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        add_version_read(pipe, user_id)
+        return int((await pipe.execute())[1])
+
+
+def bump_user_version(*user_ids):
+    """
+    Marks the claims in every outstanding token of these users as stale:
+    the next read picks a new version none of them carries.
+    """
+    if user_ids:
+        redis_client.delete(*(USER_VERSION_KEY.format(user_id) for user_id in user_ids))
+
+
+def token_claims(user, version):
+    return {
+        "role": user.role,
+        "approved": user.is_approved,
+        "staff": user.is_staff,
+        "ver": version,
+    }
+
+
+# ---------- request.user ----------
+
+class ClaimsUser:
+    """
+    What request.user is for JWT requests. Enough for the permission classes;
+    views that need the rest of the row call get_user().
+    """
+
+    __slots__ = ("id", "role", "is_approved", "is_staff", "is_active", "version")
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, role, is_approved, is_staff, version, is_active=True):
+        self.id = id
+        self.role = role
+        self.is_approved = is_approved
+        self.is_staff = is_staff
+        self.is_active = is_active
+        self.version = version
+
+    @classmethod
+    def from_token(cls, user_id, token):
+        return cls(user_id, token["role"], token["approved"], token["staff"], token["ver"])
+
+    @classmethod
+    def from_user(cls, user, version):
+        return cls(
+            user.id, user.role, user.is_approved, user.is_staff, version, user.is_active
+        )
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_user(self):
+        """
+        The full User row, always read fresh so it is safe to save.
+        """
+        return User.objects.get(pk=self.id)
+
+    def __eq__(self, other):
+        return isinstance(other, ClaimsUser) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __str__(self):
+        return f"ClaimsUser {self.id}"
+
+
+# ---------- login challenge snapshot ----------
+
+LOGIN_CONTEXT_FORMAT = 1
+
+
+def set_claims(user, claims):
+    # a user deleted since the credentials were checked logs in as inactive
+    claims = claims or {"is_active": False}
+    for field, value in claims.items():
+        setattr(user, field, value)
+    user._loaded_claims = user.claim_values()
+
+
+def fresh_claims_query(user):
+    return (
+        User.objects.using(DEFAULT_DB_ALIAS)
+        .filter(pk=user.id)
+        .values(*User.CLAIM_FIELDS)
+    )
+
+
+def read_login_claims(user):
+    """
+    The user's version, then their claims re-read from the primary into
+    user. The row that matched the credentials may be older than the
+    version (read from a replica, or changed since): claims read after the
+    version are never older than it, so the snapshot can only err stale.
+    """
+    version = get_user_version(user.id)
+    set_claims(user, fresh_claims_query(user).first())
+    return version
+
+
+async def aread_login_claims(user):
+    version = await aget_user_version(user.id)
+    set_claims(user, await fresh_claims_query(user).afirst())
+    return version
+
+
+def login_context(user, version):
+    """
+    Stored with a login challenge: everything verify-login needs to mint
+    tokens, so the OTP step doesn't read the User row.
+    """
+    return json.dumps(
+        {"fmt": LOGIN_CONTEXT_FORMAT, "id": user.id, **token_claims(user, version)},
+        separators=(",", ":"),
+    )
+
+
+def read_login_context(raw):
+    """
+    -> (user_id, snapshot or None). Challenges stored before snapshots (a
+    bare id) or in another format only give the id.
+    """
+    context = json.loads(raw)
+    if not isinstance(context, dict):
+        return context, None
+    if context.get("fmt") != LOGIN_CONTEXT_FORMAT:
+        return context["id"], None
+    return context["id"], context
+
+
+def snapshot_user(user_id, snapshot, version):
+    """
+    The ClaimsUser in the snapshot if its claims are still current, else
+    None and the caller reads the row.
+    """
+    if snapshot is None or version is None or snapshot["ver"] != version:
+        return None
+    return ClaimsUser.from_token(user_id, snapshot)
+
+
+class UserRowCache:
+    """
+    Per-process LRU of User rows keyed by (id, version), each kept for at
+    most ttl seconds. Only used for tokens whose claims went stale.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.rows = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.rows.get(key)
+            if entry is None:
+                return None
+            user, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self.rows[key]
+                return None
+            self.rows.move_to_end(key)
+            return user
+
+    def set(self, key, user):
+        if not self.maxsize:
+            return
+        with self.lock:
+            self.rows[key] = (user, time.monotonic())
+            self.rows.move_to_end(key)
+            while len(self.rows) > self.maxsize:
+                self.rows.popitem(last=False)
+
+
+user_rows = UserRowCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        try:
+            version = get_user_version(user_id)
+        except RedisError:
+            # can't tell whether the claims are current; trust the database
+            version = None
+
+        if version is not None and validated_token.get("ver") == version:
+            return ClaimsUser.from_token(user_id, validated_token)
+
+        user = self.load_row(user_id, version)
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return ClaimsUser.from_user(user, version)
+
+    def load_row(self, user_id, version):
+        if version is not None:
+            user = user_rows.get((user_id, version))
+            if user is not None:
+                return user
+
+        try:
+            user = User.objects.get(pk=user_id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+
+        if version is not None:
+            user_rows.set((user_id, version), user)
+        return user
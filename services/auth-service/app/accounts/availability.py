@@ -0,0 +1,117 @@
+"""
+Redis sets of every registered email and username, lowercased.
+
+A value missing from a built index is definitely free and costs one Redis
+round trip. A member may still be free (case differences, a rename whose
+removal is in flight), so those answers are confirmed against the table.
+"""
+import logging
+from django.utils import timezone
+from redis.exceptions import RedisError
+from .models import User
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+INDEX_KEYS = {
+    "email": "taken:emails",
+    "username": "taken:usernames",
+}
+# set once a rebuild has completed; until then every check goes to the DB
+READY_KEY = "taken:ready"
+REBUILD_CHUNK = 5000
+
+
+def is_taken(field, value, exclude_user_id=None):
+    try:
+        with redis_client.pipeline(transaction=False) as pipe:
+            pipe.exists(READY_KEY)
+            pipe.sismember(INDEX_KEYS[field], value.lower())
+            ready, member = pipe.execute()
+        if ready and not member:
+            return False
+    except RedisError:
+        logger.warning("Availability index unavailable; checking %s in the DB", field)
+
+    users = User.objects.filter(**{field: value})
+    if exclude_user_id is not None:
+        users = users.exclude(id=exclude_user_id)
+    return users.exists()
+
+
+def email_taken(value):
+    return is_taken("email", value)
+
+
+def username_taken(value, exclude_user_id=None):
+    return is_taken("username", value, exclude_user_id)
+
+
+def index_user(email, username, old_email=None, old_username=None):
+    changes = (("email", email, old_email), ("username", username, old_username))
+    with redis_client.pipeline(transaction=False) as pipe:
+        for field, value, old_value in changes:
+            if value is None:  # deferred and untouched
+                continue
+            if old_value and old_value.lower() != value.lower():
+                pipe.srem(INDEX_KEYS[field], old_value.lower())
+            pipe.sadd(INDEX_KEYS[field], value.lower())
+        pipe.execute()
+
+
+def unindex_user(email, username):
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.srem(INDEX_KEYS["email"], email.lower())
+        pipe.srem(INDEX_KEYS["username"], username.lower())
+        pipe.execute()
+
+
+def rebuild_index():
+    """
+    Loads both sets from the table into scratch keys and swaps them in with
+    RENAME, so checks never see a half-built index. Returns the user count.
+    """
+    started_at = timezone.now()
+    scratch = {field: f"{key}:rebuild" for field, key in INDEX_KEYS.items()}
+    redis_client.delete(*scratch.values())
+
+    count = 0
+    rows = User.objects.values_list("email", "username").iterator(
+        chunk_size=REBUILD_CHUNK
+    )
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == REBUILD_CHUNK:
+            count += _load_chunk(scratch, chunk)
+            chunk = []
+    count += _load_chunk(scratch, chunk)
+
+    with redis_client.pipeline() as pipe:
+        for field, key in INDEX_KEYS.items():
+            if count:
+                pipe.rename(scratch[field], key)
+            else:
+                pipe.delete(key)
+        pipe.set(READY_KEY, 1)
+        pipe.execute()
+
+    # signups indexed by the signal while the scratch sets were loading
+    _load_chunk(
+        INDEX_KEYS,
+        list(
+            User.objects.filter(created_at__gte=started_at)
+            .values_list("email", "username")
+        ),
+    )
+    return count
+
+
+def _load_chunk(keys, chunk):
+    if not chunk:
+        return 0
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.sadd(keys["email"], *(email.lower() for email, _ in chunk))
+        pipe.sadd(keys["username"], *(username.lower() for _, username in chunk))
+        pipe.execute()
+    return len(chunk)
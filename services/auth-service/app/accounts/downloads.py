@@ -0,0 +1,178 @@
+"""
+Protected file downloads.
+
+The view decides who may have a file; the bytes should not pass through a
+worker. With PROTECTED_MEDIA_SERVER set the front proxy sends them: nginx
+through X-Accel-Redirect to an `internal` location aliasing MEDIA_ROOT,
+Apache (mod_xsendfile) or lighttpd through X-Sendfile. Both handle Range
+and conditional requests themselves.
+
+Without a proxy the file goes out as a FileResponse, which gunicorn's sync
+workers hand to os.sendfile(). Single byte ranges, If-Range and the
+ETag / Last-Modified preconditions are handled here.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import (
+    content_disposition_header,
+    http_date,
+    parse_http_date_safe,
+)
+from .storage import BLOB_DIR, content_storage
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+BLOCK_SIZE = 64 * 1024
+
+# the Range header asked for nothing inside the file
+UNSATISFIABLE = object()
+
+
+class FileRange:
+    """
+    length bytes of an open file from its current offset. No seek() or
+    tell(), so FileResponse leaves Content-Length to the caller; fileno()
+    lets gunicorn sendfile() exactly that span.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def serve_protected(request, name, filename):
+    """
+    The stored file name (under MEDIA_ROOT) as a download called filename,
+    for a request that has already been authorized.
+    """
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    server = settings.PROTECTED_MEDIA_SERVER
+
+    if server == "nginx":
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = settings.PROTECTED_MEDIA_PREFIX + quote(name)
+    elif server == "sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = content_storage.path(name)
+    else:
+        return file_response(request, name, filename, content_type)
+
+    # the proxy drops the (empty) body and sends the file with these headers
+    response["Content-Disposition"] = content_disposition_header(False, filename)
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def file_response(request, name, filename, content_type):
+    path = content_storage.path(name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404("File not found")
+
+    etag = file_etag(name, stat)
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        byte_range = requested_range(request, stat.st_size, etag, last_modified)
+        if byte_range is UNSATISFIABLE:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+        else:
+            response = open_file_response(
+                path, byte_range, stat.st_size, filename, content_type
+            )
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def open_file_response(path, byte_range, size, filename, content_type):
+    file = open(path, "rb")
+    if byte_range is None:
+        response = FileResponse(file, filename=filename, content_type=content_type)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(
+            FileRange(file, end - start + 1),
+            status=206,
+            filename=filename,
+            content_type=content_type,
+        )
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response.block_size = BLOCK_SIZE
+    return response
+
+
+def file_etag(name, stat):
+    # content-addressed names carry the content hash; older files fall back
+    # to size and mtime like most web servers
+    if name.startswith(f"{BLOB_DIR}/"):
+        return '"%s"' % os.path.splitext(os.path.basename(name))[0]
+    return '"%x-%x"' % (stat.st_size, int(stat.st_mtime))
+
+
+def requested_range(request, size, etag, last_modified):
+    """
+    (first, last) byte of a single-range request, None to send the whole
+    file (no Range, several ranges, or a stale If-Range) or UNSATISFIABLE.
+    """
+    header = request.headers.get("Range")
+    if not header or request.method not in ("GET", "HEAD"):
+        return None
+
+    if_range = request.headers.get("If-Range")
+    if if_range:
+        if if_range.startswith('"'):
+            if if_range != etag:
+                return None
+        elif parse_http_date_safe(if_range) != last_modified:
+            return None
+
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        # multipart/byteranges isn't worth it for PDFs and images
+        return None
+
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # suffix range: the final n bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return UNSATISFIABLE
+        return max(size - length, 0), size - 1
+
+    first = int(first)
+    last = int(last) if last else size - 1
+    if first >= size:
+        return UNSATISFIABLE
+    if last < first:
+        return None
+    return first, min(last, size - 1)
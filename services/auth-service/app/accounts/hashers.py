@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with parameters sized for the hashing pool: one lane per job
+    (the pool supplies the parallelism) and a memory cost that keeps
+    PASSWORD_HASH_POOL_SIZE concurrent hashes within the container budget.
+    """
+
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+import django
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework.exceptions import APIException
+from .metrics import PASSWORD_HASH_TIME
+
+
+class HashingUnavailable(APIException):
+    status_code = 503
+    default_detail = "Server is busy, please try again shortly."
+    default_code = "hashing_unavailable"
+
+
+_pool = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+
+
+def _reset_after_fork():
+    # a forked child must never reuse its parent's executor
+    global _pool, _slots
+    _pool = None
+    _slots = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_pool():
+    global _pool, _slots
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_POOL_SIZE,
+                initializer=_init_worker,
+                initargs=(os.environ["DJANGO_SETTINGS_MODULE"],),
+            )
+            # running + queued jobs this process may have outstanding
+            _slots = threading.BoundedSemaphore(
+                settings.PASSWORD_HASH_POOL_SIZE + settings.PASSWORD_HASH_MAX_PENDING
+            )
+        return _pool, _slots
+
+
+def submit(fn, *args):
+    """
+    Queues fn(*args) on the hashing pool, failing fast with a 503 when the
+    pool already has PASSWORD_HASH_MAX_PENDING jobs waiting.
+    """
+    pool, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        raise HashingUnavailable()
+
+    try:
+        future = pool.submit(fn, *args)
+    except Exception:
+        slots.release()
+        raise
+
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def run(fn, *args):
+    if not settings.PASSWORD_HASH_POOL_SIZE:
+        return fn(*args)
+
+    future = submit(fn, *args)
+    try:
+        return future.result(timeout=settings.PASSWORD_HASH_TIMEOUT)
+    except TimeoutError:
+        future.cancel()
+        raise HashingUnavailable()
+
+
+async def arun(fn, *args):
+    if not settings.PASSWORD_HASH_POOL_SIZE:
+        return fn(*args)
+
+    future = submit(fn, *args)
+    try:
+        return await asyncio.wait_for(
+            asyncio.wrap_future(future), settings.PASSWORD_HASH_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        raise HashingUnavailable()
+
+
+def must_update(encoded):
+    preferred = hashers.get_hasher("default")
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+# ---------- public API ----------
+
+def make_password(password):
+    with PASSWORD_HASH_TIME.labels("make").time():
+        return run(hashers.make_password, password)
+
+
+def check_password(user, raw_password):
+    """
+    Pool-backed equivalent of AbstractBaseUser.check_password, including the
+    transparent upgrade of hashes made with an older hasher or parameters.
+    """
+    with PASSWORD_HASH_TIME.labels("check").time():
+        matches = run(hashers.check_password, raw_password, user.password)
+    if not matches:
+        return False
+
+    if must_update(user.password):
+        user.password = make_password(raw_password)
+        user.save(update_fields=["password"])
+
+    return True
+
+
+async def amake_password(password):
+    with PASSWORD_HASH_TIME.labels("make").time():
+        return await arun(hashers.make_password, password)
+
+
+async def acheck_password(user, raw_password):
+    with PASSWORD_HASH_TIME.labels("check").time():
+        matches = await arun(hashers.check_password, raw_password, user.password)
+    if not matches:
+        return False
+
+    if must_update(user.password):
+        user.password = await amake_password(raw_password)
+        await user.asave(update_fields=["password"])
+
+    return True
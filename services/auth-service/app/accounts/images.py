@@ -0,0 +1,56 @@
+import io
+from django.core.files.base import ContentFile
+from .storage import content_storage
+
+# square edge in px -> what clients pick for avatars and profile headers
+VARIANT_SIZES = (96, 256, 512)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def generate_variants(image_name):
+    """
+    Writes square WebP and JPEG thumbnails of a stored image and returns
+    {"<size>": {"webp": name, "jpeg": name}}. Pixels are re-encoded from
+    scratch, so EXIF (GPS, camera serials), ICC and XMP are not carried over.
+
+    Thumbnails are content-addressed like the image: profiles with the same
+    picture share them, each holding a reference.
+    """
+    # Pillow is only needed by the worker that makes thumbnails
+    from PIL import Image, ImageOps
+
+    with content_storage.open(image_name, "rb") as f:
+        image = Image.open(f)
+        # JPEG sources decode straight at a reduced scale
+        image.draft("RGB", (max(VARIANT_SIZES), max(VARIANT_SIZES)))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGB")
+
+    variants = {}
+    for size in VARIANT_SIZES:
+        thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        variants[str(size)] = {}
+        for ext, (image_format, options) in VARIANT_FORMATS.items():
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, image_format, **options)
+
+            variants[str(size)][ext] = content_storage.save(
+                f"{size}.{ext}", ContentFile(buffer.getvalue())
+            )
+    return variants
+
+
+def delete_variants(variants):
+    for formats in variants.values():
+        for name in formats.values():
+            content_storage.delete(name)
+
+
+def variant_urls(variants):
+    return {
+        size: {ext: content_storage.url(name) for ext, name in formats.items()}
+        for size, formats in (variants or {}).items()
+    }
@@ -1,8 +1,96 @@
+import time
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import get_user_version, token_claims
+from .models import User
+from . import token_families as families
 
-def generate_tokens(user):
+
+def generate_tokens(user, version):
+    """
+    user is a User row or a ClaimsUser; version is get_user_version(), read
+    before the row.
+    """
     refresh = RefreshToken.for_user(user)
+    # copied into the access token; lets ClaimsJWTAuthentication skip the DB
+    for claim, value in token_claims(user, version).items():
+        refresh[claim] = value
+
+    family_id = families.new_family_id()
+    refresh[families.FAMILY_CLAIM] = family_id
+    families.start_family(family_id, user.id, families.jti_of(refresh))
+
     return {
         "access": str(refresh.access_token),
         "refresh": str(refresh),
     }
+
+
+def rotate_tokens(raw_refresh):
+    """
+    Exchanges a refresh token for a new access/refresh pair. The presented
+    token stops working; presenting it again revokes its whole family.
+    """
+    try:
+        refresh = RefreshToken(raw_refresh)
+    except TokenError as exc:
+        raise InvalidToken(str(exc))
+
+    user_id = refresh[api_settings.USER_ID_CLAIM]
+    family_id = families.family_of(refresh)
+    old_jti = families.jti_of(refresh)
+    remaining = refresh["exp"] - int(time.time())
+
+    # same claims, fresh jti / exp / iat
+    refresh.set_jti()
+    refresh.set_exp()
+    refresh.set_iat()
+
+    if family_id:
+        status, _ = families.rotate(family_id, old_jti, families.jti_of(refresh))
+        if status == families.REUSED:
+            raise InvalidToken("Refresh token reuse detected; please log in again")
+        if status != families.ROTATED:
+            raise InvalidToken("Refresh token revoked")
+    else:
+        # minted before families existed: allow one exchange into a family
+        if not families.consume_legacy_jti(old_jti, remaining):
+            raise InvalidToken("Refresh token revoked")
+        family_id = families.new_family_id()
+        refresh[families.FAMILY_CLAIM] = family_id
+        families.start_family(family_id, user_id, families.jti_of(refresh))
+
+    version = get_user_version(user_id)
+    if refresh.get("ver") != version:
+        # role, approval or active changed since login; re-read the row
+        user = User.objects.filter(pk=user_id).first()
+        if user is None or not user.is_active:
+            families.revoke_family(family_id)
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        for claim, value in token_claims(user, version).items():
+            refresh[claim] = value
+
+    return {
+        "access": str(refresh.access_token),
+        "refresh": str(refresh),
+    }
+
+
+def revoke_tokens(raw_refresh):
+    """
+    Logs a refresh token's session out. Tokens that no longer verify are
+    ignored: they can't be used anyway.
+    """
+    try:
+        refresh = RefreshToken(raw_refresh)
+    except TokenError:
+        return
+
+    family_id = families.family_of(refresh)
+    if family_id:
+        families.revoke_family(family_id)
+    else:
+        families.consume_legacy_jti(
+            families.jti_of(refresh), refresh["exp"] - int(time.time())
+        )
@@ -0,0 +1,338 @@
+import json
+import logging
+import smtplib
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from .metrics import OTP_ENQUEUE_TIME
+from .redis_client import redis_client, async_redis_client
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_KEY = "mail:outbox"
+DEAD_LETTER_KEY = "mail:outbox:dead"
+# failed messages wait here, scored by when they are due again
+RETRY_KEY = "mail:outbox:retry"
+# each drain moves a batch into its own list and deletes it once sent; a
+# drain whose lease (renewed per batch) runs out has died, and its batch
+# goes back to the outbox
+SENDING_KEY = "mail:outbox:sending:{}"
+DRAINS_KEY = "mail:outbox:drains"
+SENDING_LEASE = 120
+# set while a drain task is queued or running; expires if its worker dies
+DRAIN_SCHEDULED_KEY = "mail:outbox:drain"
+DRAIN_SCHEDULED_TTL = 60
+
+# failures that mean the connection is gone, not that the message is bad
+CONNECTION_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+PROMOTE_RETRIES_LUA = """
+local due = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, ARGV[2])
+if #due > 0 then
+    redis.call("ZREM", KEYS[1], unpack(due))
+    redis.call("RPUSH", KEYS[2], unpack(due))
+end
+return #due
+"""
+
+RECOVER_DRAINS_LUA = """
+local dead = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", ARGV[1])
+for _, drain_id in ipairs(dead) do
+    local sending = ARGV[2] .. drain_id
+    while redis.call("LMOVE", sending, KEYS[2], "RIGHT", "LEFT") do end
+    redis.call("ZREM", KEYS[1], drain_id)
+end
+return #dead
+"""
+
+promote_retries_script = redis_client.register_script(PROMOTE_RETRIES_LUA)
+recover_drains_script = redis_client.register_script(RECOVER_DRAINS_LUA)
+
+
+# ---------- producer side ----------
+
+def add_to_outbox(pipe, to, subject, body, attempts=0):
+    pipe.rpush(
+        OUTBOX_KEY,
+        json.dumps({"to": to, "subject": subject, "body": body, "attempts": attempts}),
+    )
+    pipe.set(DRAIN_SCHEDULED_KEY, 1, nx=True, ex=DRAIN_SCHEDULED_TTL)
+
+
+def queue_mail(to, subject, body):
+    """
+    Appends a message to the outbox in one round trip. A drain task is only
+    published when none is already queued, so a burst of OTPs costs one
+    Celery message per batch instead of one per email.
+    """
+    with redis_client.pipeline(transaction=False) as pipe:
+        add_to_outbox(pipe, to, subject, body)
+        _, drain_needed = pipe.execute()
+
+    if drain_needed:
+        schedule_drain()
+
+
+async def aqueue_mail(to, subject, body):
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        add_to_outbox(pipe, to, subject, body)
+        _, drain_needed = await pipe.execute()
+
+    if drain_needed:
+        from asgiref.sync import sync_to_async
+
+        await sync_to_async(schedule_drain, thread_sensitive=False)()
+
+
+def queue_many(messages):
+    """
+    Queues (to, subject, body) tuples with a single pipeline.
+    """
+    if not messages:
+        return
+
+    with redis_client.pipeline(transaction=False) as pipe:
+        for to, subject, body in messages:
+            add_to_outbox(pipe, to, subject, body)
+        replies = pipe.execute()
+
+    if any(replies[1::2]):
+        schedule_drain()
+
+
+def schedule_drain(countdown=None):
+    from .tasks import drain_mail_outbox
+
+    drain_mail_outbox.apply_async(countdown=countdown)
+
+
+def otp_subject_and_body(otp, login=False):
+    subject = "Your Login OTP" if login else "Your OTP"
+    return subject, f"Your OTP is {otp}"
+
+
+def queue_otp_email(email, otp, login=False):
+    with OTP_ENQUEUE_TIME.time():
+        queue_mail(email, *otp_subject_and_body(otp, login))
+
+
+async def aqueue_otp_email(email, otp, login=False):
+    with OTP_ENQUEUE_TIME.time():
+        await aqueue_mail(email, *otp_subject_and_body(otp, login))
+
+
+# ---------- delivery side ----------
+
+class MailSession:
+    """
+    One SMTP connection, opened lazily and reused across tasks and
+    batches so TLS and AUTH are paid once rather than per message.
+    """
+
+    def __init__(self, connection_factory=get_connection):
+        self.connection_factory = connection_factory
+        self.connection = None
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def get(self):
+        if (
+            self.connection is not None
+            and time.monotonic() - self.opened_at > settings.MAIL_CONNECTION_MAX_AGE
+        ):
+            self.close()
+
+        if self.connection is None:
+            connection = self.connection_factory(fail_silently=False)
+            connection.open()
+            self.connection = connection
+            self.opened_at = time.monotonic()
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def send(self, message):
+        with self.lock:
+            try:
+                return self.get().send_messages([message])
+            except CONNECTION_ERRORS:
+                # the server dropped us (idle timeout, restart); reconnect once
+                self.close()
+                return self.get().send_messages([message])
+
+
+class SessionPool:
+    """
+    The worker process's MailSessions. A task checks one out for as long as
+    it sends and returns it, so the threads and gevent pools (where each
+    task runs in a fresh greenlet) reuse connections across tasks; at most
+    CELERY_WORKER_CONCURRENCY are open, one per task running at once.
+    """
+
+    def __init__(self, size):
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.idle = []
+
+    @contextmanager
+    def checkout(self):
+        with self.slots:
+            with self.lock:
+                # most recently used first: the likeliest to still be open
+                mail_session = self.idle.pop() if self.idle else MailSession()
+            try:
+                yield mail_session
+            finally:
+                with self.lock:
+                    self.idle.append(mail_session)
+
+    def close_all(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for mail_session in idle:
+            mail_session.close()
+
+    def reset(self):
+        # a forked child must not share the parent's sockets
+        self.idle = []
+
+
+sessions = SessionPool(settings.CELERY_WORKER_CONCURRENCY)
+os.register_at_fork(after_in_child=sessions.reset)
+
+
+def send_batch(messages, mail_session=None):
+    """
+    Sends outbox entries over one pooled connection. Entries that fail are
+    returned so the caller can requeue them.
+    """
+    if mail_session is None:
+        with sessions.checkout() as mail_session:
+            return send_batch(messages, mail_session)
+
+    failed = []
+    for entry in messages:
+        message = EmailMessage(
+            subject=entry["subject"],
+            body=entry["body"],
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[entry["to"]],
+        )
+        try:
+            mail_session.send(message)
+        except Exception:
+            logger.exception("Sending mail to %s failed", entry["to"])
+            failed.append(entry)
+    return failed
+
+
+def drain_outbox():
+    """
+    Sends the outbox in batches of MAIL_BATCH_SIZE until it is empty or
+    MAIL_DRAIN_TIME_BUDGET runs out. Failed messages wait MAIL_RETRY_DELAY
+    in the retry set, up to MAIL_MAX_ATTEMPTS, then go to the dead letters.
+
+    A batch stays in this drain's sending list until it has been sent, so a
+    worker dying mid-batch delays those messages instead of losing them (and
+    may send some twice).
+    """
+    start = time.monotonic()
+    sent = 0
+    retried = 0
+    drain_id = uuid.uuid4().hex
+    sending = SENDING_KEY.format(drain_id)
+
+    recover_abandoned_batches()
+    promote_due_retries()
+
+    try:
+        with sessions.checkout() as mail_session:
+            while time.monotonic() - start < settings.MAIL_DRAIN_TIME_BUDGET:
+                raw = claim_batch(drain_id, sending)
+                if not raw:
+                    break
+
+                batch = [json.loads(item) for item in raw]
+                failed = send_batch(batch, mail_session)
+                sent += len(batch) - len(failed)
+                retried += settle_batch(sending, failed)
+    finally:
+        with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zrem(DRAINS_KEY, drain_id)
+            pipe.delete(DRAIN_SCHEDULED_KEY)
+            pipe.execute()
+
+    # messages queued after the last claim saw the flag and did not schedule
+    if redis_client.llen(OUTBOX_KEY) and redis_client.set(
+        DRAIN_SCHEDULED_KEY, 1, nx=True, ex=DRAIN_SCHEDULED_TTL
+    ):
+        schedule_drain()
+
+    if retried:
+        schedule_drain(countdown=settings.MAIL_RETRY_DELAY)
+
+    return sent
+
+
+def claim_batch(drain_id, sending):
+    """
+    Moves up to MAIL_BATCH_SIZE messages from the outbox into sending.
+    """
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zadd(DRAINS_KEY, {drain_id: time.time() + SENDING_LEASE})
+        for _ in range(settings.MAIL_BATCH_SIZE):
+            pipe.lmove(OUTBOX_KEY, sending, "LEFT", "RIGHT")
+        replies = pipe.execute()
+    return [item for item in replies[1:] if item is not None]
+
+
+def settle_batch(sending, failed):
+    """
+    Drops a sent batch and parks its failures. Returns how many will be
+    retried.
+    """
+    retried = 0
+    due = time.time() + settings.MAIL_RETRY_DELAY
+    with redis_client.pipeline(transaction=True) as pipe:
+        for entry in failed:
+            entry["attempts"] += 1
+            if entry["attempts"] >= settings.MAIL_MAX_ATTEMPTS:
+                logger.error("Giving up on mail to %s", entry["to"])
+                pipe.rpush(DEAD_LETTER_KEY, json.dumps(entry))
+            else:
+                pipe.zadd(RETRY_KEY, {json.dumps(entry): due})
+                retried += 1
+        pipe.delete(sending)
+        pipe.execute()
+    return retried
+
+
+def promote_due_retries():
+    return promote_retries_script(
+        keys=[RETRY_KEY, OUTBOX_KEY], args=[time.time(), 1000]
+    )
+
+
+def recover_abandoned_batches():
+    recovered = recover_drains_script(
+        keys=[DRAINS_KEY, OUTBOX_KEY], args=[time.time(), SENDING_KEY.format("")]
+    )
+    if recovered:
+        logger.warning("Requeued mail from %d abandoned drain(s)", recovered)
+    return recovered
@@ -0,0 +1,80 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.redis_client import redis_client
+from accounts.tasks import latency_probe
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure enqueue-to-send latency of the otp queue under load. Needs a "
+        "running worker, e.g. CELERY_WORKER_PROFILE=threads celery -A config "
+        "worker -Q otp; compare profiles by restarting it with another one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=500)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=0,
+            help="Tasks published per second; 0 publishes the whole burst at once.",
+        )
+        parser.add_argument(
+            "--work-ms",
+            type=float,
+            default=50.0,
+            help="Time each task holds the worker, modelling one SMTP send.",
+        )
+        parser.add_argument("--queue", default="otp")
+        parser.add_argument("--timeout", type=float, default=120.0)
+
+    def handle(self, *args, **options):
+        count = options["tasks"]
+        results_key = f"bench:celery:{uuid.uuid4().hex}"
+        interval = 1 / options["rate"] if options["rate"] else 0
+
+        try:
+            start = time.perf_counter()
+            for i in range(count):
+                if interval:
+                    # pace against the schedule, not the previous publish
+                    delay = start + i * interval - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                latency_probe.apply_async(
+                    (results_key, time.time(), options["work_ms"]),
+                    queue=options["queue"],
+                )
+            publish_elapsed = time.perf_counter() - start
+
+            deadline = time.monotonic() + options["timeout"]
+            while redis_client.llen(results_key) < count:
+                if time.monotonic() > deadline:
+                    raise CommandError(
+                        f"only {redis_client.llen(results_key)}/{count} tasks ran "
+                        f"within {options['timeout']}s; is a worker consuming "
+                        f"{options['queue']!r}?"
+                    )
+                time.sleep(0.1)
+            total_elapsed = time.perf_counter() - start
+
+            latencies = sorted(
+                float(value) * 1000 for value in redis_client.lrange(results_key, 0, -1)
+            )
+        finally:
+            redis_client.delete(results_key)
+
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        self.stdout.write(
+            f"{count} tasks, published in {publish_elapsed:.2f}s, "
+            f"all sent after {total_elapsed:.2f}s "
+            f"({count / total_elapsed:.1f} tasks/s)"
+        )
+        self.stdout.write(
+            f"enqueue-to-send ms  p50 {cuts[49]:.1f}  p95 {cuts[94]:.1f}  "
+            f"p99 {cuts[98]:.1f}  max {latencies[-1]:.1f}"
+        )
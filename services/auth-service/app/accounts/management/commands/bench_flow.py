@@ -0,0 +1,328 @@
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone
+
+import redis
+import redis.asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import mail
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, override_settings
+from django.test.client import MULTIPART_CONTENT, encode_multipart, BOUNDARY
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from accounts import redis_client as redis_module
+from config.celery import app as celery_app
+
+API = "/api/auth"
+PASSWORD = "Bench-passw0rd!"
+
+OTP_MAIL_TIMEOUT = 10
+
+# one virtual user walks these in order; a failed step ends its flow.
+# otp_delivery is the wait from the request returning to the mail landing.
+STEPS = (
+    "register",
+    "otp_delivery",
+    "verify_otp",
+    "registration_status",
+    "login",
+    "verify_login_otp",
+    "profile_get",
+    "profile_get_304",
+    "profile_patch",
+)
+
+
+class StepFailed(Exception):
+    pass
+
+
+# ---------- stand-ins ----------
+
+def use_fake_redis():
+    # the OTP, throttle, token and mail paths run Lua, which needs lupa
+    try:
+        import fakeredis
+        import lupa  # noqa: F401
+    except ImportError:
+        raise CommandError(
+            "install fakeredis[lua] (requirements-dev.txt) or pass --redis-url"
+        )
+
+    server = fakeredis.FakeServer()
+    redis_module.redis_client.connection_pool = redis.ConnectionPool(
+        connection_class=fakeredis.FakeConnection, server=server, decode_responses=True
+    )
+    redis_module.async_redis_client.connection_pool = redis.asyncio.ConnectionPool(
+        connection_class=fakeredis.FakeAsyncConnection,
+        server=server,
+        decode_responses=True,
+    )
+
+
+def use_redis_url(url):
+    # same pool options as production, pointed at the scratch database
+    with override_settings(REDIS_URL=url):
+        redis_module.redis_client.connection_pool = redis_module.build_connection_pool()
+        redis_module.async_redis_client.connection_pool = (
+            redis_module.build_async_connection_pool()
+        )
+    # test DB ids restart at 1, so keys left by an earlier run would collide
+    redis_module.redis_client.flushdb()
+
+
+def unthrottled():
+    """
+    Every virtual user shares one client address, so the limits are raised
+    out of reach; the sliding-window checks still run on every request.
+    """
+    rest_framework = dict(settings.REST_FRAMEWORK)
+    rest_framework["DEFAULT_THROTTLE_RATES"] = {
+        scope: "1000000/m" for scope in rest_framework["DEFAULT_THROTTLE_RATES"]
+    }
+    return override_settings(REST_FRAMEWORK=rest_framework)
+
+
+async def captured_otp(email, nth, samples):
+    """
+    Waits for the nth mail to email. Delivery is batched through the outbox,
+    so another user's drain may still be sending it when the request returns.
+    """
+    start = time.perf_counter()
+    while time.perf_counter() - start < OTP_MAIL_TIMEOUT:
+        # OTP mails end with the code; the locmem outbox is shared by every user
+        received = [m for m in list(mail.outbox) if email in m.to]
+        if len(received) >= nth:
+            samples.append(("otp_delivery", time.perf_counter() - start, True))
+            return received[nth - 1].body.split()[-1]
+        await asyncio.sleep(0.005)
+    samples.append(("otp_delivery", OTP_MAIL_TIMEOUT, False))
+    raise StepFailed(f"otp_delivery: mail {nth} to {email} never arrived")
+
+
+# ---------- one virtual user ----------
+
+async def run_user(run_id, n, samples):
+    email = f"bench-{run_id}-{n}@example.com"
+    client = AsyncClient()
+
+    async def timed(step, expected, request):
+        start = time.perf_counter()
+        response = await request
+        elapsed = time.perf_counter() - start
+        ok = response.status_code == expected
+        samples.append((step, elapsed, ok))
+        if not ok:
+            raise StepFailed(f"{step}: HTTP {response.status_code} {response.content[:200]!r}")
+        return response
+
+    response = await timed("register", 201, client.post(f"{API}/register/", {
+        "email": email,
+        "username": f"bench{run_id}{n}",
+        "full_name": "Bench User",
+        "password": PASSWORD,
+        "role": "developer",
+        "skills": ["python", "django"],
+    }))
+    otp_id = response.json()["otp_id"]
+    otp = await captured_otp(email, 1, samples)
+
+    response = await timed("verify_otp", 202, client.post(
+        f"{API}/verify-otp/",
+        {"otp_id": otp_id, "otp": otp},
+        content_type="application/json",
+    ))
+    # finalize_registration runs eagerly here, so the first poll has the outcome
+    response = await timed("registration_status", 200, client.get(
+        response.json()["status_url"]
+    ))
+    if response.json()["state"] != "completed":
+        raise StepFailed(f"registration_status: {response.json()}")
+    await timed("login", 200, client.post(
+        f"{API}/login/",
+        {"email": email, "password": PASSWORD},
+        content_type="application/json",
+    ))
+    otp = await captured_otp(email, 2, samples)
+    response = await timed("verify_login_otp", 200, client.post(
+        f"{API}/verify-login-otp/",
+        {"otp": otp},
+        content_type="application/json",
+    ))
+    auth = {"Authorization": f"Bearer {response.json()['access']}"}
+
+    response = await timed("profile_get", 200, client.get(
+        f"{API}/profile/", headers=auth
+    ))
+    etag = response["ETag"]
+    await timed("profile_get_304", 304, client.get(
+        f"{API}/profile/", headers={**auth, "If-None-Match": etag}
+    ))
+    await timed("profile_patch", 200, client.patch(
+        f"{API}/profile/",
+        encode_multipart(BOUNDARY, {"full_name": f"Bench User {n}", "skills": ["go"]}),
+        content_type=MULTIPART_CONTENT,
+        headers=auth,
+    ))
+
+
+async def run_users(run_id, first, count, concurrency):
+    """
+    Runs count flows, at most concurrency at a time, on one event loop: the
+    way a gunicorn + UvicornWorker process serves them.
+    """
+    samples, failures = [], []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(n):
+        async with slots:
+            try:
+                await run_user(run_id, n, samples)
+            except StepFailed as exc:
+                failures.append(str(exc))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(first, first + count)))
+    wall = time.perf_counter() - start
+    # sync views ran in the shared sync_to_async thread; the test database
+    # can't be dropped while it holds a connection
+    await sync_to_async(connections.close_all)()
+    return samples, failures, wall
+
+
+async def bench(run_id, warmup, users, concurrency):
+    # one loop for both phases: the async Redis pool stays bound to it
+    if warmup:
+        await run_users(run_id, 0, warmup, concurrency)
+    return await run_users(run_id, warmup, users, concurrency)
+
+
+# ---------- report ----------
+
+def summarize(samples, wall):
+    endpoints = {}
+    for step in STEPS:
+        times = sorted(elapsed * 1000 for name, elapsed, _ in samples if name == step)
+        if not times:
+            continue
+        if len(times) > 1:
+            cuts = statistics.quantiles(times, n=100, method="inclusive")
+        else:
+            cuts = times * 99
+        endpoints[step] = {
+            "requests": len(times),
+            "errors": sum(1 for name, _, ok in samples if name == step and not ok),
+            "throughput_rps": round(len(times) / wall, 2),
+            "mean_ms": round(statistics.fmean(times), 2),
+            "p50_ms": round(cuts[49], 2),
+            "p95_ms": round(cuts[94], 2),
+            "p99_ms": round(cuts[98], 2),
+            "max_ms": round(times[-1], 2),
+        }
+    return endpoints
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive register -> verify-otp -> status -> login -> verify-login-otp -> profile "
+        "GET/PATCH through the ASGI handler and full middleware stack against "
+        "a throwaway test database, with OTP mail captured in memory, and "
+        "report per-endpoint "
+        "throughput and p50/p95/p99 as JSON. Set ASYNC_AUTH_VIEWS=1 to bench "
+        "the async auth views."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=10,
+            help="Flows run first and left out of the numbers (pools, scripts).",
+        )
+        parser.add_argument(
+            "--redis-url",
+            help="Scratch Redis database to use; it is FLUSHED. Default: fakeredis.",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Reuse the test database between runs instead of recreating it.",
+        )
+        parser.add_argument(
+            "--output",
+            help="Where to write the JSON results (default: bench-flow-<time>.json).",
+        )
+
+    def handle(self, *args, **options):
+        if options["redis_url"]:
+            use_redis_url(options["redis_url"])
+        else:
+            use_fake_redis()
+
+        # locmem email backend; drain tasks run in the request like .delay() would
+        setup_test_environment()
+        celery_app.conf.task_always_eager = True
+        old_config = setup_databases(
+            verbosity=0, interactive=False, keepdb=options["keepdb"]
+        )
+        run_id = uuid.uuid4().hex[:8]
+        started_at = datetime.now(timezone.utc)
+        try:
+            with unthrottled():
+                samples, failures, wall = asyncio.run(
+                    bench(
+                        run_id, options["warmup"], options["users"], options["concurrency"]
+                    )
+                )
+            vendor = connection.vendor
+        finally:
+            connections.close_all()
+            teardown_databases(old_config, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        completed = options["users"] - len(failures)
+        results = {
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "database": vendor,
+            "redis": "url" if options["redis_url"] else "fakeredis",
+            "users": options["users"],
+            "concurrency": options["concurrency"],
+            "wall_seconds": round(wall, 3),
+            "flows_completed": completed,
+            "flows_per_second": round(completed / wall, 2),
+            "failures": failures[:20],
+            "endpoints": summarize(samples, wall),
+        }
+
+        output = options["output"] or f"bench-flow-{started_at:%Y%m%d-%H%M%S}.json"
+        with open(output, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+        self.stdout.write(
+            f"{completed}/{options['users']} flows in {wall:.2f}s "
+            f"({results['flows_per_second']} flows/s, {vendor}, {results['redis']})"
+        )
+        self.stdout.write(
+            f"{'endpoint':<21}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}"
+        )
+        for step, row in results["endpoints"].items():
+            self.stdout.write(
+                f"{step:<21}{row['throughput_rps']:>8}{row['p50_ms']:>9}"
+                f"{row['p95_ms']:>9}{row['p99_ms']:>9}{row['errors']:>8}"
+            )
+        for failure in failures[:5]:
+            self.stderr.write(failure)
+        self.stdout.write(f"results written to {output}")
@@ -0,0 +1,76 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+
+from accounts import hashing
+
+PASSWORD = "correct horse battery staple"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password checks (logins) per second per core: inline PBKDF2 "
+        "on the request thread versus the configured hasher on the hashing pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=200)
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=32,
+            help="Concurrent request threads submitting to the pool.",
+        )
+
+    def handle(self, *args, **options):
+        logins = options["logins"]
+
+        pbkdf2 = hashers.make_password(PASSWORD, hasher="pbkdf2_sha256")
+        preferred = hashers.make_password(PASSWORD)
+        algorithm = hashers.identify_hasher(preferred).algorithm
+
+        # before: one sync worker checks PBKDF2 inline, one login at a time
+        start = time.perf_counter()
+        for _ in range(logins):
+            hashers.check_password(PASSWORD, pbkdf2)
+        inline = logins / (time.perf_counter() - start)
+        self.stdout.write(f"inline pbkdf2_sha256: {inline:8.1f} logins/s per core")
+
+        start = time.perf_counter()
+        for _ in range(logins):
+            hashers.check_password(PASSWORD, preferred)
+        inline = logins / (time.perf_counter() - start)
+        self.stdout.write(f"inline {algorithm}: {inline:8.1f} logins/s per core")
+
+        # after: many request threads share the bounded pool
+        pool_size = settings.PASSWORD_HASH_POOL_SIZE
+        if not pool_size:
+            self.stdout.write("PASSWORD_HASH_POOL_SIZE is 0, skipping the pool run")
+            return
+
+        # warm the pool so process start-up is not measured
+        hashing.run(hashers.check_password, PASSWORD, preferred)
+
+        rejected = 0
+
+        def login(_):
+            nonlocal rejected
+            try:
+                hashing.run(hashers.check_password, PASSWORD, preferred)
+            except hashing.HashingUnavailable:
+                rejected += 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["clients"]) as clients:
+            list(clients.map(login, range(logins)))
+        elapsed = time.perf_counter() - start
+        served = logins - rejected
+
+        self.stdout.write(
+            f"pool {algorithm} x{pool_size}: {served / elapsed:8.1f} logins/s total, "
+            f"{served / elapsed / pool_size:8.1f} per core, "
+            f"{rejected} fast 503s at {options['clients']} concurrent clients"
+        )
@@ -0,0 +1,127 @@
+import socketserver
+import threading
+import time
+
+from django.core.mail import EmailMessage
+from django.core.mail.backends.smtp import EmailBackend
+from django.core.management.base import BaseCommand
+
+from accounts.mail import MailSession, send_batch
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough SMTP for Django's backend. The connect delay stands in for
+    the TCP + TLS handshake and AUTH round trips of a real provider.
+    """
+
+    def handle(self):
+        time.sleep(self.server.handshake_delay)
+        self.reply(b"220 stand-in ESMTP")
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                self.reply(b"250 stand-in")
+            elif command == b"DATA":
+                self.reply(b"354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.received += 1
+                self.reply(b"250 queued")
+            elif command == b"QUIT":
+                self.reply(b"221 bye")
+                return
+            else:
+                self.reply(b"250 ok")
+
+    def reply(self, text):
+        self.wfile.write(text + b"\r\n")
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, handshake_delay):
+        super().__init__(("127.0.0.1", 0), SMTPStandInHandler)
+        self.handshake_delay = handshake_delay
+        self.received = 0
+        self.lock = threading.Lock()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare one SMTP connection per OTP (send_mail) with batched delivery "
+        "over a persistent connection, against a local SMTP stand-in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument(
+            "--handshake-ms",
+            type=float,
+            default=50.0,
+            help="Delay per new connection, modelling TLS + AUTH to the provider.",
+        )
+
+    def handle(self, *args, **options):
+        server = SMTPStandIn(options["handshake_ms"] / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+
+        def backend(**kwargs):
+            return EmailBackend(
+                host=host, port=port, username="", password="", use_tls=False, **kwargs
+            )
+
+        count = options["messages"]
+        entries = [
+            {
+                "to": f"user{i}@example.com",
+                "subject": "Your OTP",
+                "body": "Your OTP is 123456",
+                "attempts": 0,
+            }
+            for i in range(count)
+        ]
+
+        try:
+            # before: send_mail opens, greets and closes a connection per OTP
+            start = time.perf_counter()
+            for entry in entries:
+                message = EmailMessage(
+                    entry["subject"], entry["body"], "otp@example.com", [entry["to"]]
+                )
+                backend(fail_silently=False).send_messages([message])
+            self.report("per-message connection", count, time.perf_counter() - start)
+
+            # after: batches drained over one reused connection
+            session = MailSession(connection_factory=backend)
+            batch_size = options["batch_size"]
+            start = time.perf_counter()
+            for i in range(0, count, batch_size):
+                send_batch(entries[i:i + batch_size], mail_session=session)
+            session.close()
+            self.report(
+                f"persistent connection, batches of {batch_size}",
+                count,
+                time.perf_counter() - start,
+            )
+
+            self.stdout.write(f"stand-in received {server.received} messages")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def report(self, label, count, elapsed):
+        self.stdout.write(
+            f"{label:>40}: {count / elapsed:8.1f} msg/s  "
+            f"{elapsed / count * 1000:7.2f} ms/msg"
+        )
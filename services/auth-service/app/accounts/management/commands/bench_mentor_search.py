@@ -0,0 +1,144 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test.utils import setup_databases, teardown_databases
+
+from accounts.models import MentorProfile, User
+from accounts.services import search_mentors
+
+PREFIX = "benchmentor"
+# reserved (RFC 2606), so no real account can carry it
+EMAIL_DOMAIN = "bench.invalid"
+SKILLS = [
+    "python", "django", "docker", "kubernetes", "react", "typescript", "go",
+    "rust", "java", "spring", "postgres", "redis", "aws", "gcp", "terraform",
+    "graphql", "flutter", "swift", "kotlin", "node", "vue", "angular", "ml",
+    "pytorch", "tensorflow", "pandas", "spark", "kafka", "elixir", "scala",
+] + [f"skill{i}" for i in range(470)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a synthetic mentor dataset into a throwaway PostgreSQL test "
+        "database and time skill searches with mentor_skills_gin against a "
+        "forced sequential scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", type=int, default=1_000_000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the test database, and the dataset in it, for the next run.",
+        )
+        parser.add_argument(
+            "--skip-load",
+            action="store_true",
+            help="Reuse the dataset a --keepdb run left.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("bench_mentor_search needs PostgreSQL (GIN index).")
+
+        # never the real database: the load is bulk inserts that skip signals
+        old_config = setup_databases(
+            verbosity=0, interactive=False, keepdb=options["keepdb"]
+        )
+        try:
+            loaded = User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").exists()
+            if options["skip_load"]:
+                if not loaded:
+                    raise CommandError("No dataset to reuse; run once with --keepdb.")
+            else:
+                if loaded:
+                    self.clear()
+                self.load(options["profiles"], options["batch_size"])
+            self.bench(options["runs"])
+        finally:
+            connections.close_all()
+            teardown_databases(old_config, verbosity=0, keepdb=options["keepdb"])
+
+    def bench(self, runs):
+        rng = random.Random(7)
+        # popular, mixed and rare skill sets
+        queries = [
+            ["django", "docker"],
+            ["python", "kubernetes", "terraform"],
+            [rng.choice(SKILLS[30:]) for _ in range(2)],
+        ]
+
+        for skills in queries:
+            self.stdout.write(f"skills={','.join(skills)}")
+            self.time_search(skills, runs, seqscan=False)
+            self.time_search(skills, runs, seqscan=True)
+
+    def load(self, count, batch_size):
+        rng = random.Random(42)
+        # skewed so a few skills are common and most are rare
+        weights = [1 / (rank + 1) for rank in range(len(SKILLS))]
+
+        start = time.perf_counter()
+        for offset in range(0, count, batch_size):
+            size = min(batch_size, count - offset)
+            with transaction.atomic():
+                users = User.objects.bulk_create(
+                    User(
+                        email=f"{PREFIX}{offset + i}@{EMAIL_DOMAIN}",
+                        username=f"{PREFIX}{offset + i}",
+                        full_name="Bench Mentor",
+                        password="!",
+                        role=User.Role.MENTOR,
+                        is_active=True,
+                        is_verified=True,
+                        is_approved=rng.random() < 0.8,
+                    )
+                    for i in range(size)
+                )
+                MentorProfile.objects.bulk_create(
+                    MentorProfile(
+                        user=user,
+                        skills=sorted(set(
+                            rng.choices(SKILLS, weights, k=rng.randint(2, 8))
+                        )),
+                        years_of_experience=rng.randint(1, 30),
+                        experience_proof="mentor_proofs/bench.pdf",
+                    )
+                    for user in users
+                )
+            self.stdout.write(f"\rloaded {offset + size}/{count}", ending="")
+        self.stdout.write("")
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE accounts_user")
+            cursor.execute("ANALYZE accounts_mentorprofile")
+        self.stdout.write(f"load took {time.perf_counter() - start:.1f}s")
+
+    def time_search(self, skills, runs, seqscan):
+        timings = []
+        with transaction.atomic(), connection.cursor() as cursor:
+            if seqscan:
+                # what the query cost before the index existed
+                cursor.execute("SET LOCAL enable_bitmapscan = off")
+                cursor.execute("SET LOCAL enable_indexscan = off")
+
+            for _ in range(runs):
+                start = time.perf_counter()
+                page = list(search_mentors(skills, min_years=3)[:21])
+                timings.append((time.perf_counter() - start) * 1000)
+
+        label = "seq scan" if seqscan else "gin index"
+        self.stdout.write(
+            f"  {label:>9}: p50 {statistics.median(timings):8.1f} ms  "
+            f"max {max(timings):8.1f} ms  ({len(page)} rows on first page)"
+        )
+
+    def clear(self):
+        # a kept test database: only ever holds this dataset
+        with connection.cursor() as cursor:
+            cursor.execute("TRUNCATE accounts_mentorprofile, accounts_user CASCADE")
@@ -0,0 +1,123 @@
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from accounts import otp_service
+from accounts.otp_service import (
+    MAX_ATTEMPTS,
+    OTP_EXPIRED,
+    OTP_INVALID,
+    OTP_LOCKED,
+    OTP_TTL,
+    OTP_VERIFIED,
+    generate_otp,
+    verify_challenge,
+)
+from accounts.redis_client import redis_client
+
+
+def legacy_store(key, otp):
+    redis_client.setex(key, OTP_TTL, json.dumps({"otp": otp, "attempts": 0}))
+
+
+def legacy_verify(key, input_otp):
+    # the pre-engine path: GET, decode in Python, then SETEX or DELETE
+    data = redis_client.get(key)
+    if not data:
+        return OTP_EXPIRED
+
+    payload = json.loads(data)
+    if payload["attempts"] >= MAX_ATTEMPTS:
+        redis_client.delete(key)
+        return OTP_LOCKED
+
+    if payload["otp"] != input_otp:
+        payload["attempts"] += 1
+        redis_client.setex(key, OTP_TTL, json.dumps(payload))
+        return OTP_INVALID
+
+    redis_client.delete(key)
+    return OTP_VERIFIED
+
+
+def engine_store(key, otp):
+    with redis_client.pipeline(transaction=True) as pipe:
+        otp_service.add_challenge(pipe, key, otp)
+        pipe.execute()
+
+
+def engine_verify(key, input_otp):
+    status, _ = verify_challenge(key, input_otp)
+    return status
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the legacy GET/SETEX OTP verification path with the "
+        "atomic server-side script against the configured Redis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=16,
+            help="Parallel wrong guesses fired at one challenge in the race check.",
+        )
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        prefix = f"bench:otp:{uuid.uuid4().hex[:8]}"
+
+        try:
+            for name, store, verify in (
+                ("legacy", legacy_store, legacy_verify),
+                ("engine", engine_store, engine_verify),
+            ):
+                latency = self.bench_verify(prefix, name, store, verify, iterations)
+                accepted = self.race(prefix, name, store, verify, options["concurrency"])
+                self.stdout.write(
+                    f"{name:>7}: {iterations / latency:9.0f} verifications/s  "
+                    f"{latency / iterations * 1e6:7.1f} us/verify  "
+                    f"concurrent wrong guesses checked against the OTP: "
+                    f"{accepted}/{options['concurrency']} (limit {MAX_ATTEMPTS})"
+                )
+        finally:
+            keys = list(redis_client.scan_iter(f"{prefix}:*"))
+            if keys:
+                redis_client.delete(*keys)
+
+    def bench_verify(self, prefix, name, store, verify, iterations):
+        otps = [generate_otp() for _ in range(iterations)]
+        for i, otp in enumerate(otps):
+            store(f"{prefix}:{name}:{i}", otp)
+
+        # one wrong guess followed by the right one, per challenge
+        start = time.perf_counter()
+        for i, otp in enumerate(otps):
+            key = f"{prefix}:{name}:{i}"
+            verify(key, "000000" if otp != "000000" else "111111")
+            verify(key, otp)
+        return (time.perf_counter() - start) / 2
+
+    def race(self, prefix, name, store, verify, concurrency):
+        """
+        Fires concurrent wrong guesses at one challenge and returns how many
+        of them were compared against the OTP before the lockout kicked in.
+        """
+        key = f"{prefix}:{name}:race"
+        otp = generate_otp()
+        store(key, otp)
+        wrong = "000000" if otp != "000000" else "111111"
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda _: verify(key, wrong), range(concurrency)))
+
+        if name == "engine":
+            # the engine reports the guess that trips the limit as locked
+            return results.count(OTP_INVALID) + results.count(OTP_LOCKED)
+        return results.count(OTP_INVALID)
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.schema import build_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the OpenAPI schema into the gzipped artifact served at "
+        "/api/schema/. Run at build or deploy time; running processes pick "
+        "up a new build when they restart."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", help=f"Defaults to SCHEMA_FILE ({settings.SCHEMA_FILE})."
+        )
+
+    def handle(self, *args, **options):
+        path = options["output"] or settings.SCHEMA_FILE
+        artifact = build_schema(path)
+        self.stdout.write(
+            f"wrote {path}: {len(artifact.body)} bytes, "
+            f"{len(artifact.compressed)} gzipped, ETag {artifact.etag}"
+        )
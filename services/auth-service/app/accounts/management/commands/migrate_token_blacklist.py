@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.redis_client import redis_client
+from accounts.token_families import REVOKED_JTI_KEY
+
+OUTSTANDING_TABLE = "token_blacklist_outstandingtoken"
+BLACKLISTED_TABLE = "token_blacklist_blacklistedtoken"
+CHUNK = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy still-valid blacklisted refresh jtis from simplejwt's "
+        "token_blacklist tables into Redis (expiring with the tokens), then "
+        "drop the tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-tables",
+            action="store_true",
+            help="Only copy the jtis; leave the tables in place.",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        tables = set(connection.introspection.table_names())
+        if BLACKLISTED_TABLE not in tables:
+            self.stdout.write("token_blacklist tables not found; nothing to do")
+            return
+
+        now = timezone.now()
+        copied = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {OUTSTANDING_TABLE}")
+            outstanding = cursor.fetchone()[0]
+
+            # expired tokens fail signature checks anyway; only live ones matter
+            cursor.execute(
+                f"SELECT o.jti, o.expires_at FROM {BLACKLISTED_TABLE} b "
+                f"JOIN {OUTSTANDING_TABLE} o ON o.id = b.token_id "
+                "WHERE o.expires_at > %s",
+                [now],
+            )
+            while rows := cursor.fetchmany(CHUNK):
+                if not options["dry_run"]:
+                    with redis_client.pipeline(transaction=False) as pipe:
+                        for jti, expires_at in rows:
+                            ttl = int((expires_at - now).total_seconds())
+                            pipe.set(REVOKED_JTI_KEY.format(jti), 1, ex=max(ttl, 1))
+                        pipe.execute()
+                copied += len(rows)
+
+        self.stdout.write(
+            f"{outstanding} outstanding rows; {copied} unexpired blacklisted jtis "
+            f"{'would be ' if options['dry_run'] else ''}copied to Redis"
+        )
+
+        if options["keep_tables"] or options["dry_run"]:
+            return
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {BLACKLISTED_TABLE}")
+            cursor.execute(f"DROP TABLE {OUTSTANDING_TABLE}")
+            # lets the app be re-added later with a clean migrate
+            cursor.execute(
+                "DELETE FROM django_migrations WHERE app = %s", ["token_blacklist"]
+            )
+        self.stdout.write("dropped token_blacklist tables")
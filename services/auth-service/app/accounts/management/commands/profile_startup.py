@@ -0,0 +1,128 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+FIRST_PARTY = ("accounts", "config")
+
+# what a gunicorn worker does before it can serve: settings, app registry,
+# then the URLconf (and with it every view module)
+BOOT = """
+import json, time
+start = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+import importlib
+from django.conf import settings
+importlib.import_module(settings.ROOT_URLCONF)
+urls = time.perf_counter()
+print(json.dumps({"setup": setup - start, "urlconf": urls - setup, "total": urls - start}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    -X importtime lines -> {module: (self us, cumulative us)}
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():  # skips the header line
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def boot_once():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+    )
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot the app the way a worker does (django.setup() plus the URLconf) "
+        "in fresh interpreters under -X importtime, and report wall time and "
+        "the most expensive imports, so slow cold starts can be traced to a "
+        "module."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument("--output", help="Also write the report as JSON here.")
+
+    def handle(self, *args, **options):
+        phases = defaultdict(list)
+        samples = defaultdict(list)
+        for _ in range(options["runs"]):
+            timings, modules = boot_once()
+            for phase, seconds in timings.items():
+                phases[phase].append(seconds * 1000)
+            for name, (self_us, cumulative_us) in modules.items():
+                samples[name].append((self_us, cumulative_us))
+
+        # medians across runs; the first run also pays for cold .pyc reads
+        modules = {
+            name: (
+                statistics.median(s for s, _ in values) / 1000,
+                statistics.median(c for _, c in values) / 1000,
+            )
+            for name, values in samples.items()
+        }
+        packages = defaultdict(float)
+        for name, (self_ms, _) in modules.items():
+            packages[name.split(".")[0]] += self_ms
+
+        top = options["top"]
+        report = {
+            "runs": options["runs"],
+            "phases_ms": {
+                phase: round(statistics.median(values), 1)
+                for phase, values in phases.items()
+            },
+            "packages_self_ms": dict(
+                sorted(
+                    ((name, round(ms, 1)) for name, ms in packages.items()),
+                    key=lambda item: -item[1],
+                )[:top]
+            ),
+            "first_party_cumulative_ms": dict(
+                sorted(
+                    (
+                        (name, round(cumulative, 1))
+                        for name, (_, cumulative) in modules.items()
+                        if name.split(".")[0] in FIRST_PARTY
+                    ),
+                    key=lambda item: -item[1],
+                )[:top]
+            ),
+        }
+
+        self.stdout.write(
+            "boot ms (median of {runs}): setup {setup}  urlconf {urlconf}  "
+            "total {total}".format(runs=options["runs"], **report["phases_ms"])
+        )
+        self.stdout.write("\nself time by top-level package (ms)")
+        for name, ms in report["packages_self_ms"].items():
+            self.stdout.write(f"  {name:<32}{ms:>8}")
+        self.stdout.write("\nfirst-party modules, cumulative import time (ms)")
+        for name, ms in report["first_party_cumulative_ms"].items():
+            self.stdout.write(f"  {name:<32}{ms:>8}")
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"\nreport written to {options['output']}")
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.availability import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the Redis email/username availability index from the users "
+        "table. Run once on deploy and after bulk imports that bypass signals."
+    )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = rebuild_index()
+        self.stdout.write(
+            f"indexed {count} users in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
@@ -0,0 +1,91 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Sum
+
+from accounts.models import StoredBlob
+from accounts.storage import BLOB_DIR, content_storage
+
+
+def human(size):
+    if size < 1024:
+        return f"{size} B"
+    for unit in ("KiB", "MiB", "GiB"):
+        size /= 1024
+        if size < 1024 or unit == "GiB":
+            return f"{size:.1f} {unit}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Report what content-addressed storage holds: distinct files, the "
+        "references to them, and the disk space deduplication saves. With "
+        "--check, also walk the blob directory for files without a row and "
+        "rows without a file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=10)
+        parser.add_argument("--check", action="store_true")
+        parser.add_argument("--output", help="Also write the report as JSON here.")
+
+    def handle(self, *args, **options):
+        totals = StoredBlob.objects.aggregate(
+            blobs=Count("id"),
+            references=Sum("refs", default=0),
+            stored_bytes=Sum("size", default=0),
+            referenced_bytes=Sum(F("size") * F("refs"), default=0),
+        )
+        report = {
+            **totals,
+            "saved_bytes": totals["referenced_bytes"] - totals["stored_bytes"],
+            "most_shared": [
+                {"name": name, "refs": refs, "size": size}
+                for name, refs, size in StoredBlob.objects.filter(refs__gt=1)
+                .order_by("-refs", "-size")
+                .values_list("name", "refs", "size")[: options["top"]]
+            ],
+        }
+
+        self.stdout.write(
+            f"{report['blobs']} files, {report['references']} references\n"
+            f"on disk    {human(report['stored_bytes'])}\n"
+            f"referenced {human(report['referenced_bytes'])}\n"
+            f"saved      {human(report['saved_bytes'])}"
+        )
+        if report["most_shared"]:
+            self.stdout.write("\nmost shared")
+            for blob in report["most_shared"]:
+                self.stdout.write(
+                    f"  {blob['refs']:>5} x {human(blob['size']):>10}  {blob['name']}"
+                )
+
+        if options["check"]:
+            report["untracked"], report["missing"] = self.compare_with_disk()
+            self.stdout.write(
+                f"\n{len(report['untracked'])} files without a row, "
+                f"{len(report['missing'])} rows without a file"
+            )
+            for name in (report["untracked"] + report["missing"])[: options["top"]]:
+                self.stdout.write(f"  {name}")
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"\nreport written to {options['output']}")
+
+    def compare_with_disk(self):
+        on_disk = set()
+        root = content_storage.path(BLOB_DIR)
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.startswith(".incoming-"):
+                    continue
+                path = os.path.relpath(
+                    os.path.join(directory, filename), content_storage.location
+                )
+                on_disk.add(path.replace(os.sep, "/"))
+
+        tracked = set(StoredBlob.objects.values_list("name", flat=True))
+        return sorted(on_disk - tracked), sorted(tracked - on_disk)
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.reaper import reap_orphan_uploads
+from accounts.redis_client import redis_client
+
+
+class Command(BaseCommand):
+    help = (
+        "Reap orphaned mentor proofs as soon as their pending registration "
+        "expires, driven by Redis keyspace expiry notifications. Complements "
+        "the periodic reap_orphan_uploads beat task."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--configure",
+            action="store_true",
+            help="Enable expired-key events on the server (notify-keyspace-events Ex).",
+        )
+        parser.add_argument(
+            "--debounce",
+            type=float,
+            default=1.0,
+            help="Minimum seconds between sweeps when expiries arrive in bursts.",
+        )
+
+    def handle(self, *args, **options):
+        if options["configure"]:
+            redis_client.config_set("notify-keyspace-events", "Ex")
+
+        db = redis_client.connection_pool.connection_kwargs.get("db", 0)
+        channel = f"__keyevent@{db}__:expired"
+
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(channel)
+        self.stdout.write(f"Listening on {channel}")
+
+        last_sweep = 0.0
+        due = False
+        try:
+            while True:
+                message = pubsub.get_message(timeout=options["debounce"])
+                if message and message["data"].startswith("otp:register:"):
+                    due = True
+
+                if due and time.monotonic() - last_sweep >= options["debounce"]:
+                    stats = reap_orphan_uploads()
+                    last_sweep = time.monotonic()
+                    due = False
+                    if stats["files"]:
+                        self.stdout.write(
+                            f"reaped {stats['files']} files, {stats['bytes']} bytes "
+                            f"in {stats['duration_ms']} ms"
+                        )
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pubsub.close()
@@ -0,0 +1,128 @@
+"""
+Prometheus metrics for the auth service.
+
+With PROMETHEUS_MULTIPROC_DIR set (see config/gunicorn.conf.py) every worker
+writes its samples to mmapped files in that directory and /metrics sums
+them, so any worker can answer the scrape. Observing a sample is a dict
+lookup and a float add; nothing here talks to the network.
+"""
+import os
+import time
+from contextvars import ContextVar
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# requests are dominated by Argon2 (tens of ms); Redis and SQL by sub-ms calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+REQUEST_LATENCY = Histogram(
+    "auth_http_request_duration_seconds",
+    "Request latency by view and status code.",
+    ["view", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "auth_db_queries_per_request",
+    "ORM queries run while serving one request.",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50),
+)
+DB_TIME = Histogram(
+    "auth_db_time_per_request_seconds",
+    "Time spent in ORM queries while serving one request.",
+    ["view"],
+    buckets=FAST_BUCKETS,
+)
+REDIS_COMMANDS = Counter(
+    "auth_redis_commands_total",
+    "Redis round trips; pipelines count once as PIPELINE.",
+    ["command"],
+)
+REDIS_TIME = Histogram(
+    "auth_redis_command_duration_seconds",
+    "Redis round-trip time.",
+    ["command"],
+    buckets=FAST_BUCKETS,
+)
+OTP_ENQUEUE_TIME = Histogram(
+    "auth_otp_enqueue_seconds",
+    "Time for a request to hand an OTP email off (outbox push and, when "
+    "needed, the Celery publish of a drain task).",
+    buckets=FAST_BUCKETS,
+)
+CELERY_PUBLISH_TIME = Histogram(
+    "auth_celery_publish_seconds",
+    "Time to publish a task to the broker.",
+    ["task"],
+    buckets=FAST_BUCKETS,
+)
+PASSWORD_HASH_TIME = Histogram(
+    "auth_password_hash_seconds",
+    "Password hash / verify time, including any wait for the hashing pool.",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+# ---------- per-request ORM stats ----------
+
+class RequestStats:
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# a mutable object, so queries run in sync_to_async threads (which get a
+# copy of the context) still add to the request's totals
+request_stats = ContextVar("request_stats", default=None)
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Installed on every DB connection (connection.execute_wrappers).
+    """
+    stats = request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+def observe_request(view, method, status, duration, stats):
+    REQUEST_LATENCY.labels(view, method, status).observe(duration)
+    DB_QUERIES.labels(view).observe(stats.queries)
+    DB_TIME.labels(view).observe(stats.db_time)
+
+
+def observe_redis(command, duration):
+    REDIS_COMMANDS.labels(command).inc()
+    REDIS_TIME.labels(command).observe(duration)
+
+
+# ---------- exposition ----------
+
+def render():
+    """
+    Returns (body, content type) for a scrape.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
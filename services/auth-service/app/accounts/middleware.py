@@ -0,0 +1,49 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from .metrics import RequestStats, observe_request, request_stats
+
+
+class MetricsMiddleware:
+    """
+    Records latency, ORM query count and ORM time per request, labelled by
+    URL route (not path, so ids don't explode the label set). Runs natively
+    under both WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_stats.reset(token)
+        self.observe(request, response, time.perf_counter() - start, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_stats.reset(token)
+        self.observe(request, response, time.perf_counter() - start, stats)
+        return response
+
+    def observe(self, request, response, duration, stats):
+        match = getattr(request, "resolver_match", None)
+        view = match.route if match else "unmatched"
+        observe_request(view, request.method, response.status_code, duration, stats)
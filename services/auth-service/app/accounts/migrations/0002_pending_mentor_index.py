@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_approved', False), ('role', 'mentor')), fields=['created_at', 'id'], name='pending_mentor_idx'),
+        ),
+    ]
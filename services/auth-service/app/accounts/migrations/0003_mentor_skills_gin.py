@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:40
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_pending_mentor_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mentorprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['skills'], name='mentor_skills_gin'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:20
+
+import accounts.storage
+import accounts.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_profile_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('sha256', models.CharField(max_length=64)),
+                ('size', models.PositiveBigIntegerField()),
+                ('refs', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='developerprofile',
+            name='profile_image',
+            field=models.ImageField(blank=True, null=True, storage=accounts.storage.ContentAddressedStorage(), upload_to='profiles/developers/'),
+        ),
+        migrations.AlterField(
+            model_name='mentorprofile',
+            name='experience_proof',
+            field=models.FileField(storage=accounts.storage.ContentAddressedStorage(), upload_to='mentor_proofs/', validators=[accounts.validators.validate_experience_proof]),
+        ),
+        migrations.AlterField(
+            model_name='mentorprofile',
+            name='profile_image',
+            field=models.ImageField(blank=True, null=True, storage=accounts.storage.ContentAddressedStorage(), upload_to='profiles/mentors/'),
+        ),
+    ]
@@ -1,7 +1,9 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.utils import timezone
 from .validators import validate_experience_proof
+from .storage import content_storage
 from .managers import UserManager
 
 
@@ -37,6 +39,40 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = UserManager()
 
+    class Meta:
+        indexes = [
+            # the admin approval queue, walked in signup order
+            models.Index(
+                fields=["created_at", "id"],
+                name="pending_mentor_idx",
+                condition=models.Q(role="mentor", is_approved=False, is_active=True),
+            ),
+        ]
+
+    # carried in access tokens; changing any of them bumps the user's version
+    CLAIM_FIELDS = ("role", "is_approved", "is_staff", "is_active")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user._loaded_claims = user.claim_values()
+        user._loaded_names = user.name_values()
+        return user
+
+    def loaded_values(self, fields):
+        # deferred fields read as None instead of costing a query each
+        return tuple(self.__dict__.get(field) for field in fields)
+
+    def claim_values(self):
+        return self.loaded_values(self.CLAIM_FIELDS)
+
+    def name_values(self):
+        return self.loaded_values(("email", "username"))
+
+    def claims_changed(self):
+        # instances built by hand have nothing to compare with
+        return getattr(self, "_loaded_claims", None) != self.claim_values()
+
 
 class DeveloperProfile(models.Model):
     user = models.OneToOneField(
@@ -46,8 +82,13 @@ class DeveloperProfile(models.Model):
     skills = models.JSONField()  # ["Python", "Django", "Docker"]
 
     profile_image = models.ImageField(
-        upload_to="profiles/developers/", blank=True, null=True
+        upload_to="profiles/developers/",
+        storage=content_storage,
+        blank=True,
+        null=True,
     )
+    # {"<size>": {"webp": name, "jpeg": name}}, filled in by a Celery task
+    image_variants = models.JSONField(default=dict, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -59,11 +100,38 @@ class MentorProfile(models.Model):
 
     skills = models.JSONField()
     profile_image = models.ImageField(
-        upload_to="profiles/mentors/", blank=True, null=True
+        upload_to="profiles/mentors/",
+        storage=content_storage,
+        blank=True,
+        null=True,
     )
+    # {"<size>": {"webp": name, "jpeg": name}}, filled in by a Celery task
+    image_variants = models.JSONField(default=dict, blank=True)
     years_of_experience = models.PositiveIntegerField()
     experience_proof = models.FileField(
-        upload_to="mentor_proofs/", validators=[validate_experience_proof]
+        upload_to="mentor_proofs/",
+        storage=content_storage,
+        validators=[validate_experience_proof],
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # skills are lowercased lists; serves ?| (any of) and @> (contains)
+            GinIndex(fields=["skills"], name="mentor_skills_gin"),
+        ]
+
+
+class StoredBlob(models.Model):
+    """
+    A file in content-addressed storage (accounts.storage) and how many
+    fields or pending registrations refer to it.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    sha256 = models.CharField(max_length=64)
+    size = models.PositiveBigIntegerField()
+    refs = models.PositiveIntegerField(default=1)
+
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -1,52 +1,189 @@
 import random
 import json
-from .redis_client import redis_client
-from .tasks import send_otp_email
+from .redis_client import redis_client, async_redis_client
+from .mail import queue_otp_email
+from .utils import hash_otp
+from .uploads import track_pending_upload
 
 
 
 OTP_TTL = 300  # 5 minutes
 MAX_ATTEMPTS = 3
 
+# verification outcomes
+OTP_VERIFIED = "verified"
+OTP_EXPIRED = "expired"
+OTP_INVALID = "invalid"
+OTP_LOCKED = "locked"
+
+MESSAGES = {
+    OTP_VERIFIED: "OTP verified",
+    OTP_EXPIRED: "OTP expired or not found",
+    OTP_INVALID: "Invalid OTP",
+    OTP_LOCKED: "Too many attempts",
+}
+
+# KEYS[1]    challenge hash: otp (sha256), attempts, optional payload
+# KEYS[2..n] context keys, returned and consumed together with the challenge
+# ARGV[1]    sha256 of the submitted OTP
+# ARGV[2]    max attempts
+VERIFY_CHALLENGE_LUA = """
+local stored = redis.call("HGET", KEYS[1], "otp")
+if not stored then
+    return {0}
+end
+if stored ~= ARGV[1] then
+    local attempts = redis.call("HINCRBY", KEYS[1], "attempts", 1)
+    if attempts >= tonumber(ARGV[2]) then
+        redis.call("DEL", unpack(KEYS))
+        return {2}
+    end
+    return {1}
+end
+local result = {3, redis.call("HGET", KEYS[1], "payload")}
+for i = 2, #KEYS do
+    result[#result + 1] = redis.call("GET", KEYS[i])
+end
+redis.call("DEL", unpack(KEYS))
+return result
+"""
+
+# registered once per process; redis-py calls EVALSHA and only ships the
+# script body again if the server answers NOSCRIPT
+verify_challenge_script = redis_client.register_script(VERIFY_CHALLENGE_LUA)
+async_verify_challenge_script = async_redis_client.register_script(
+    VERIFY_CHALLENGE_LUA
+)
+
+_STATUS = {0: OTP_EXPIRED, 1: OTP_INVALID, 2: OTP_LOCKED, 3: OTP_VERIFIED}
+
 
 def generate_otp():
     return str(random.randint(100000, 999999))
 
 
+# ---------- engine ----------
 
+def add_challenge(pipe, key, otp, payload=None):
+    mapping = {"otp": hash_otp(otp), "attempts": 0}
+    if payload is not None:
+        mapping["payload"] = payload
+    pipe.hset(key, mapping=mapping)
+    pipe.expire(key, OTP_TTL)
 
-def send_otp(email):
-    otp = generate_otp()
-    key = f"otp:register:{email}"
 
-    redis_client.setex(
-        key,
-        OTP_TTL,
-        json.dumps({"otp": otp, "attempts": 0})
+def verify_challenge(key, input_otp, *context_keys):
+    """
+    Checks the OTP, counts the attempt and consumes the challenge in one
+    atomic server-side call.
+
+    Returns (status, values) where values is [payload, *context] on success.
+    """
+    reply = verify_challenge_script(
+        keys=[key, *context_keys],
+        args=[hash_otp(input_otp), MAX_ATTEMPTS],
     )
+    return _STATUS[reply[0]], reply[1:]
 
-    # 🔥 async email send
-    send_otp_email.delay(email, otp)
 
+async def averify_challenge(key, input_otp, *context_keys):
+    reply = await async_verify_challenge_script(
+        keys=[key, *context_keys],
+        args=[hash_otp(input_otp), MAX_ATTEMPTS],
+    )
+    return _STATUS[reply[0]], reply[1:]
 
 
-def verify_otp(email, input_otp):
-    key = f"otp:register:{email}"
-    data = redis_client.get(key)
+# ---------- register challenge ----------
+
+def add_register_challenge(pipe, otp_id, otp, payload):
+    add_challenge(pipe, f"otp:register:{otp_id}", otp, json.dumps(payload))
+    if payload.get("experience_proof_name"):
+        # lets the reaper find the proof if the OTP is never verified
+        track_pending_upload(
+            pipe, otp_id, payload["experience_proof_name"], OTP_TTL
+        )
+
+
+def store_register_challenge(otp_id, otp, payload):
+    with redis_client.pipeline(transaction=True) as pipe:
+        add_register_challenge(pipe, otp_id, otp, payload)
+        pipe.execute()
+
+
+async def astore_register_challenge(otp_id, otp, payload):
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        add_register_challenge(pipe, otp_id, otp, payload)
+        await pipe.execute()
+
+
+def verify_register_challenge(otp_id, input_otp):
+    status, values = verify_challenge(f"otp:register:{otp_id}", input_otp)
+    return _register_result(status, values)
+
+
+async def averify_register_challenge(otp_id, input_otp):
+    status, values = await averify_challenge(f"otp:register:{otp_id}", input_otp)
+    return _register_result(status, values)
+
+
+def _register_result(status, values):
+    if status != OTP_VERIFIED:
+        return status, None
+    return status, json.loads(values[0])
+
 
-    if not data:
-        return False, "OTP expired or not found"
+# ---------- login challenge ----------
 
-    payload = json.loads(data)
+def store_login_challenge(challenge_id, otp, context):
+    with redis_client.pipeline(transaction=True) as pipe:
+        add_challenge(pipe, f"otp:{challenge_id}", otp)
+        pipe.setex(f"login_ctx:{challenge_id}", OTP_TTL, context)
+        pipe.execute()
 
-    if payload["attempts"] >= MAX_ATTEMPTS:
-        redis_client.delete(key)
-        return False, "Too many attempts"
 
-    if payload["otp"] != input_otp:
-        payload["attempts"] += 1
-        redis_client.setex(key, OTP_TTL, json.dumps(payload))
-        return False, "Invalid OTP"
+async def astore_login_challenge(challenge_id, otp, context):
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        add_challenge(pipe, f"otp:{challenge_id}", otp)
+        pipe.setex(f"login_ctx:{challenge_id}", OTP_TTL, context)
+        await pipe.execute()
 
-    redis_client.delete(key)
-    return True, "OTP verified"
+
+def verify_login_challenge(challenge_id, input_otp):
+    status, values = verify_challenge(
+        f"otp:{challenge_id}", input_otp, f"login_ctx:{challenge_id}"
+    )
+    return _login_result(status, values)
+
+
+async def averify_login_challenge(challenge_id, input_otp):
+    status, values = await averify_challenge(
+        f"otp:{challenge_id}", input_otp, f"login_ctx:{challenge_id}"
+    )
+    return _login_result(status, values)
+
+
+def _login_result(status, values):
+    if status == OTP_VERIFIED and not values[1]:
+        status = OTP_EXPIRED
+    if status != OTP_VERIFIED:
+        return status, None
+    return status, values[1]
+
+
+# ---------- email-keyed OTP ----------
+
+def send_otp(email):
+    otp = generate_otp()
+
+    with redis_client.pipeline(transaction=True) as pipe:
+        add_challenge(pipe, f"otp:register:{email}", otp)
+        pipe.execute()
+
+    # 🔥 async email send
+    queue_otp_email(email, otp)
+
+
+def verify_otp(email, input_otp):
+    status, _ = verify_challenge(f"otp:register:{email}", input_otp)
+    return status == OTP_VERIFIED, MESSAGES[status]
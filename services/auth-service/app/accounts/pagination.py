@@ -0,0 +1,51 @@
+import base64
+import json
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+
+def encode_cursor(*values):
+    """
+    Opaque token for the sort key of the last row on a page.
+    """
+    raw = json.dumps(values, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, *types):
+    """
+    The values encode_cursor was given, each checked and converted by the
+    matching entry of types (cursor_int, cursor_datetime). Anything a client
+    could have tampered with is a 400, not an error from the query.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return [convert(value) for convert, value in zip(types, values)]
+    except ValueError:
+        raise serializers.ValidationError({"cursor": "Invalid cursor."})
+
+
+def cursor_int(value):
+    # within a BigIntegerField, so the database never sees an overflow
+    if type(value) is not int or not -2**63 <= value < 2**63:
+        raise ValueError
+    return value
+
+
+def cursor_datetime(value):
+    # parse_datetime raises ValueError itself for impossible dates
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise ValueError
+    return parsed
+
+
+def page_limit(request, default=50, maximum=200):
+    try:
+        limit = int(request.query_params.get("limit", default))
+    except ValueError:
+        raise serializers.ValidationError({"limit": "Must be an integer."})
+    return max(1, min(limit, maximum))
@@ -0,0 +1,92 @@
+import hashlib
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from .images import variant_urls
+from .models import User
+from .redis_client import redis_client
+from .serializers import ProfileDetailSerializer
+
+# value is "<etag>\n<json body>" so one GET answers both 304s and 200s
+PROFILE_KEY = "profile:doc:{}"
+
+
+def profile_key(user_id):
+    return PROFILE_KEY.format(user_id)
+
+
+def profile_data(user):
+    data = {
+        "email": user.email,
+        "username": user.username,
+        "full_name": user.full_name,
+        "phone": user.phone,
+        "role": user.role,
+    }
+
+    if user.role == User.Role.DEVELOPER:
+        profile = user.developer_profile
+        data.update(
+            {
+                "skills": profile.skills,
+                "profile_image": profile.profile_image,
+                "image_variants": variant_urls(profile.image_variants),
+            }
+        )
+
+    elif user.role == User.Role.MENTOR:
+        profile = user.mentor_profile
+        data.update(
+            {
+                "skills": profile.skills,
+                "profile_image": profile.profile_image,
+                "image_variants": variant_urls(profile.image_variants),
+                "years_of_experience": profile.years_of_experience,
+                "experience_proof": profile.experience_proof,
+            }
+        )
+
+    return data
+
+
+def render_profile(user):
+    """
+    Serializes the profile once; returns (etag, body).
+    """
+    body = JSONRenderer().render(ProfileDetailSerializer(profile_data(user)).data)
+    etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+    return etag, body.decode()
+
+
+def get_profile(user_id):
+    """
+    Returns (etag, body), or None on a cache miss.
+    """
+    cached = redis_client.get(profile_key(user_id))
+    if cached is None:
+        return None
+    etag, _, body = cached.partition("\n")
+    return etag, body
+
+
+def fill_profile(user):
+    """
+    Renders and caches the profile after a miss. NX so a document loaded
+    before a concurrent update never overwrites the one that update stored.
+    """
+    etag, body = render_profile(user)
+    redis_client.set(
+        profile_key(user.id), f"{etag}\n{body}", nx=True, ex=settings.PROFILE_CACHE_TTL
+    )
+    return etag, body
+
+
+def replace_profile(user):
+    etag, body = render_profile(user)
+    redis_client.set(
+        profile_key(user.id), f"{etag}\n{body}", ex=settings.PROFILE_CACHE_TTL
+    )
+    return etag, body
+
+
+def invalidate_profile(user_id):
+    redis_client.delete(profile_key(user_id))
@@ -0,0 +1,135 @@
+import logging
+import os
+import time
+from django.conf import settings
+from .models import MentorProfile
+from .otp_service import OTP_TTL
+from .redis_client import redis_client
+from .registration import PAYLOAD_KEY
+from .storage import content_storage
+from .uploads import INCOMING_DIR, PENDING_UPLOADS_KEY
+
+logger = logging.getLogger(__name__)
+
+REAPER_STATS_KEY = "uploads:reaper:stats"
+BATCH_SIZE = 500
+
+# pre-streaming uploads were copied here and moved on verification
+LEGACY_TEMP_DIR = os.path.join("temp", "mentor")
+
+
+def reap_orphan_uploads(time_budget=30.0):
+    """
+    Releases the proofs held by pending registrations that expired without
+    being verified (or finalized); a proof's file goes with its last
+    reference.
+
+    Works through the pending-upload zset in batches: one pipelined EXISTS per
+    batch for the registration keys, one pipelined ZREM claiming the expired
+    entries, and one query for pre-content-addressing proofs already attached
+    to a MentorProfile.
+    """
+    start = time.monotonic()
+    files = reclaimed = 0
+
+    while time.monotonic() - start < time_budget:
+        due = redis_client.zrangebyscore(
+            PENDING_UPLOADS_KEY, "-inf", time.time(), start=0, num=BATCH_SIZE
+        )
+        if not due:
+            break
+
+        entries = [member.partition("|")[::2] for member in due]
+
+        # awaiting its OTP, or verified and waiting for finalize_registration
+        with redis_client.pipeline(transaction=False) as pipe:
+            for otp_id, _ in entries:
+                pipe.exists(f"otp:register:{otp_id}", PAYLOAD_KEY.format(otp_id))
+            pending = pipe.execute()
+
+        done = [
+            member for member, still_pending in zip(due, pending) if not still_pending
+        ]
+        if not done:
+            # everything due is still awaiting its OTP; try again next sweep
+            break
+
+        # one ZREM each: an entry finalize removed meanwhile was its to release
+        with redis_client.pipeline(transaction=False) as pipe:
+            for member in done:
+                pipe.zrem(PENDING_UPLOADS_KEY, member)
+            claimed = pipe.execute()
+
+        names = [member.partition("|")[2] for member in done]
+        referenced = set(
+            MentorProfile.objects.filter(experience_proof__in=names)
+            .values_list("experience_proof", flat=True)
+        )
+
+        for name, removed in zip(names, claimed):
+            if not removed:
+                continue
+            freed = content_storage.release(name)
+            if freed is None and name not in referenced:
+                # streamed before content addressing: a file of its own
+                freed = _remove(os.path.join(settings.MEDIA_ROOT, name))
+            if freed:
+                files += 1
+                reclaimed += freed
+
+    for directory in (INCOMING_DIR, LEGACY_TEMP_DIR):
+        stale_files, stale_bytes = _reap_stale_files(directory)
+        files += stale_files
+        reclaimed += stale_bytes
+
+    duration_ms = round((time.monotonic() - start) * 1000, 1)
+    _record(files, reclaimed, duration_ms)
+    logger.info(
+        "Upload reaper removed %d files (%d bytes) in %.1f ms",
+        files, reclaimed, duration_ms,
+    )
+    return {"files": files, "bytes": reclaimed, "duration_ms": duration_ms}
+
+
+def _reap_stale_files(directory):
+    # streams left by a request that died before keeping or discarding them
+    temp_dir = os.path.join(settings.MEDIA_ROOT, directory)
+    if not os.path.isdir(temp_dir):
+        return 0, 0
+
+    cutoff = time.time() - OTP_TTL
+    files = reclaimed = 0
+    with os.scandir(temp_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                size = _remove(entry.path)
+                if size is not None:
+                    files += 1
+                    reclaimed += size
+    return files, reclaimed
+
+
+def _remove(path):
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+    except FileNotFoundError:
+        return None
+    return size
+
+
+def _record(files, reclaimed, duration_ms):
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hincrby(REAPER_STATS_KEY, "sweeps", 1)
+        pipe.hincrby(REAPER_STATS_KEY, "files_total", files)
+        pipe.hincrby(REAPER_STATS_KEY, "bytes_total", reclaimed)
+        pipe.hset(
+            REAPER_STATS_KEY,
+            mapping={
+                "last_files": files,
+                "last_bytes": reclaimed,
+                "last_duration_ms": duration_ms,
+                "last_run": int(time.time()),
+            },
+        )
+        pipe.execute()
@@ -1,8 +1,97 @@
+import time
 import redis
+import redis.asyncio
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+from redis.asyncio.retry import Retry as AsyncRetry
+from django.conf import settings
+from .metrics import observe_redis
 
-redis_client = redis.Redis(
-    host="127.0.0.1",
-    port=6379,
-    db=0,
-    decode_responses=True,
-)
\ No newline at end of file
+
+def connection_options():
+    return {
+        "max_connections": settings.REDIS_MAX_CONNECTIONS,
+        "socket_timeout": settings.REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        "socket_keepalive": True,
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+        "retry_on_timeout": True,
+        "decode_responses": True,
+    }
+
+
+def build_connection_pool():
+    return redis.ConnectionPool.from_url(
+        settings.REDIS_URL,
+        retry=Retry(ExponentialBackoff(cap=0.5, base=0.01), settings.REDIS_RETRIES),
+        **connection_options(),
+    )
+
+
+def build_async_connection_pool():
+    return redis.asyncio.ConnectionPool.from_url(
+        settings.REDIS_URL,
+        retry=AsyncRetry(ExponentialBackoff(cap=0.5, base=0.01), settings.REDIS_RETRIES),
+        **connection_options(),
+    )
+
+
+# ---------- instrumented clients ----------
+# each round trip is counted and timed; a pipeline is one round trip
+
+class InstrumentedRedis(redis.Redis):
+
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            observe_redis(str(args[0]).upper(), time.perf_counter() - start)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+
+    def execute(self, raise_on_error=True):
+        start = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            observe_redis("PIPELINE", time.perf_counter() - start)
+
+
+class InstrumentedAsyncRedis(redis.asyncio.Redis):
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            observe_redis(str(args[0]).upper(), time.perf_counter() - start)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedAsyncPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+class InstrumentedAsyncPipeline(redis.asyncio.client.Pipeline):
+
+    async def execute(self, raise_on_error=True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            observe_redis("PIPELINE", time.perf_counter() - start)
+
+
+redis_client = InstrumentedRedis(connection_pool=build_connection_pool())
+
+# used by the ASGI views; the pool binds to the event loop of its first use
+async_redis_client = InstrumentedAsyncRedis(
+    connection_pool=build_async_connection_pool()
+)
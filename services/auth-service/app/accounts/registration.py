@@ -0,0 +1,139 @@
+"""
+Registration finalization, off the request path.
+
+verify-otp consumes the OTP, parks the verified payload in Redis next to a
+status key and publishes finalize_registration; the client polls the
+status URL. The task creates the user and profile in one transaction and
+can run more than once: a redelivered task finds the user it already made
+(same email and password hash) and reports success again.
+"""
+import json
+from django.db import DatabaseError, IntegrityError
+from .models import User
+from .redis_client import redis_client, async_redis_client
+from .services import create_registered_user, registration_message
+from .storage import content_storage
+from .uploads import release_pending_upload
+
+PAYLOAD_KEY = "reg:payload:{}"
+STATUS_KEY = "reg:status:{}"
+# long enough for a backed-up worker to get to it and the client to poll
+FINALIZE_TTL = 3600
+
+PENDING = "pending"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+# ---------- request side ----------
+
+def add_finalization(pipe, otp_id, payload):
+    pipe.set(PAYLOAD_KEY.format(otp_id), json.dumps(payload), ex=FINALIZE_TTL)
+    pipe.set(STATUS_KEY.format(otp_id), json.dumps({"state": PENDING}), ex=FINALIZE_TTL)
+
+
+def queue_finalization(otp_id, payload):
+    with redis_client.pipeline(transaction=True) as pipe:
+        add_finalization(pipe, otp_id, payload)
+        pipe.execute()
+    publish_finalization(otp_id)
+
+
+async def aqueue_finalization(otp_id, payload):
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        add_finalization(pipe, otp_id, payload)
+        await pipe.execute()
+
+    from asgiref.sync import sync_to_async
+
+    await sync_to_async(publish_finalization, thread_sensitive=False)(otp_id)
+
+
+def publish_finalization(otp_id):
+    from .tasks import finalize_registration
+
+    finalize_registration.delay(str(otp_id))
+
+
+def registration_status(otp_id):
+    raw = redis_client.get(STATUS_KEY.format(otp_id))
+    return json.loads(raw) if raw else None
+
+
+# ---------- worker side ----------
+
+def finalize(otp_id):
+    """
+    Creates the user and profile for a verified registration and records the
+    outcome. Returns the status, or None if the registration expired.
+    """
+    status = registration_status(otp_id)
+    if status is not None and status["state"] != PENDING:
+        return status
+
+    raw = redis_client.get(PAYLOAD_KEY.format(otp_id))
+    if raw is None:
+        return status
+    data = json.loads(raw)
+
+    proof = data.get("experience_proof_name")
+    if proof and not content_storage.exists(proof):
+        status = {"state": FAILED, "error": "Experience proof is missing; register again"}
+    else:
+        try:
+            user = create_registered_user(data)
+        except IntegrityError:
+            # a redelivery after the commit finds its own user
+            user = registered_user(data)
+
+        if user is None:
+            status = {"state": FAILED, "error": "User already exists"}
+        else:
+            status = {"state": COMPLETED, "message": registration_message(user)}
+
+    return record(otp_id, data, status)
+
+
+def give_up(otp_id):
+    """
+    Called once finalize_registration has run out of retries, so the client
+    polling the status sees a failure instead of pending until it expires.
+    """
+    status = registration_status(otp_id)
+    if status is not None and status["state"] != PENDING:
+        return status
+
+    raw = redis_client.get(PAYLOAD_KEY.format(otp_id))
+    data = json.loads(raw) if raw else {}
+
+    try:
+        # the last attempt may have committed and failed after
+        user = registered_user(data) if data else None
+    except DatabaseError:
+        user = None
+
+    if user is None:
+        status = {"state": FAILED, "error": "Registration could not be completed; register again"}
+    else:
+        status = {"state": COMPLETED, "message": registration_message(user)}
+    return record(otp_id, data, status)
+
+
+def registered_user(data):
+    return User.objects.filter(email=data["email"], password=data["password"]).first()
+
+
+def record(otp_id, data, status):
+    proof = data.get("experience_proof_name")
+    if proof:
+        # the pending registration's reference, now that the profile has its own
+        freed = release_pending_upload(otp_id, proof)
+        if freed is None and status["state"] == FAILED:
+            # streamed before content addressing; nothing else refers to it
+            content_storage.delete(proof)
+
+    with redis_client.pipeline(transaction=True) as pipe:
+        pipe.set(STATUS_KEY.format(otp_id), json.dumps(status), ex=FINALIZE_TTL)
+        pipe.delete(PAYLOAD_KEY.format(otp_id))
+        pipe.execute()
+    return status
@@ -0,0 +1,104 @@
+"""
+Sends explicitly marked reads to the optional "replica" database.
+
+Nothing goes to the replica by default: hot read-only paths opt in with
+use_replica(). Inside that block reads fall back to the primary once the
+block has written or while a transaction is open, and callers pass pin
+keys (see pin_primary) so a user's reads stay on the primary for
+REPLICA_PIN_SECONDS after they wrote, hiding replication lag from them.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from redis.exceptions import RedisError
+from .redis_client import redis_client
+
+REPLICA_DB_ALIAS = "replica"
+PIN_KEY = "db:pin:{}"
+
+
+class ReplicaScope:
+    __slots__ = ("wrote",)
+
+    def __init__(self):
+        self.wrote = False
+
+
+_scope = ContextVar("replica_scope", default=None)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def user_pin(user_id):
+    return f"user:{user_id}"
+
+
+def email_pin(email):
+    return f"email:{email.lower()}"
+
+
+def pin_primary(*pins):
+    if not replica_configured() or not pins:
+        return
+    try:
+        with redis_client.pipeline(transaction=False) as pipe:
+            for pin in pins:
+                pipe.set(PIN_KEY.format(pin), 1, ex=settings.REPLICA_PIN_SECONDS)
+            pipe.execute()
+    except RedisError:
+        pass  # the next read may be stale, not wrong: writes still go to primary
+
+
+def is_pinned(pins):
+    if not pins:
+        return False
+    try:
+        return bool(redis_client.exists(*(PIN_KEY.format(pin) for pin in pins)))
+    except RedisError:
+        return True
+
+
+@contextmanager
+def use_replica(*pins):
+    """
+    Reads in this block may be served by the replica, unless one of pins
+    was written recently.
+    """
+    if not replica_configured() or is_pinned(pins):
+        yield
+        return
+
+    token = _scope.set(ReplicaScope())
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        if (
+            scope is None
+            or scope.wrote
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None:
+            scope.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # same data on both
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,92 @@
+"""
+The OpenAPI document, built once and served as a static artifact.
+
+Generating it walks every view and serializer, so it is rendered by
+`manage.py build_schema` (or, failing that, on the first request a process
+gets) into a gzipped file. Each process keeps the bytes and their ETag in
+memory after the first load, and only imports drf-spectacular to build.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# drf_spectacular.renderers.OpenApiJsonRenderer.media_type
+CONTENT_TYPE = "application/vnd.oai.openapi+json"
+
+_lock = threading.Lock()
+_artifact = None
+
+
+class SchemaArtifact:
+    __slots__ = ("compressed", "etag", "_body")
+
+    def __init__(self, compressed):
+        self.compressed = compressed
+        # weak: the gzipped and plain bodies are the same document
+        self.etag = f'W/"{hashlib.sha256(compressed).hexdigest()[:32]}"'
+        self._body = None
+
+    @property
+    def body(self):
+        # only for the rare client that doesn't accept gzip
+        if self._body is None:
+            self._body = gzip.decompress(self.compressed)
+        return self._body
+
+
+def render_schema():
+    from drf_spectacular.generators import SchemaGenerator
+    from drf_spectacular.renderers import OpenApiJsonRenderer
+    from .schema_extensions import ClaimsJWTScheme  # noqa: F401  registers it
+
+    # not ROOT_URLCONF: with ASYNC_AUTH_VIEWS it routes auth to non-DRF views
+    generator = SchemaGenerator(urlconf="config.schema_urls")
+    schema = generator.get_schema(request=None, public=True)
+    return OpenApiJsonRenderer().render(schema, renderer_context={})
+
+
+def build_schema(path=None):
+    """
+    Renders the schema and writes it gzipped to path (SCHEMA_FILE), replacing
+    any previous build atomically. Returns the artifact.
+    """
+    path = path or settings.SCHEMA_FILE
+    # mtime=0 keeps the bytes, and so the ETag, stable across identical builds
+    compressed = gzip.compress(render_schema(), compresslevel=9, mtime=0)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(compressed)
+    os.replace(tmp_path, path)
+    return SchemaArtifact(compressed)
+
+
+def get_schema():
+    global _artifact
+    if _artifact is not None:
+        return _artifact
+
+    with _lock:
+        if _artifact is None:
+            try:
+                with open(settings.SCHEMA_FILE, "rb") as fh:
+                    _artifact = SchemaArtifact(fh.read())
+            except FileNotFoundError:
+                logger.warning(
+                    "%s missing; building the schema now (run build_schema at deploy)",
+                    settings.SCHEMA_FILE,
+                )
+                try:
+                    _artifact = build_schema()
+                except OSError:
+                    # read-only filesystem: keep it in memory only
+                    _artifact = SchemaArtifact(
+                        gzip.compress(render_schema(), compresslevel=9, mtime=0)
+                    )
+    return _artifact
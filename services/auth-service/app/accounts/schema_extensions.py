@@ -0,0 +1,6 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    # documents the bearer scheme like simplejwt's own
+    target_class = "accounts.authentication.ClaimsJWTAuthentication"
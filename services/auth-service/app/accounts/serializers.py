@@ -1,7 +1,15 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.urls import reverse
 from django.contrib.auth.password_validation import validate_password
 from django.core.validators import RegexValidator
+from .hashing import check_password
+from .authentication import read_login_claims
+from .availability import email_taken, username_taken
+from .images import variant_urls
+from .routers import email_pin, use_replica
+from .validators import validate_experience_proof as validate_proof_file
 
 User = get_user_model()
 
@@ -39,13 +47,19 @@ class RegistrationSerializer(serializers.Serializer):
 
     # ---------- field-level ----------
 
+    # a stale "free" from the replica is still caught by the unique index
+
     def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
+        with use_replica():
+            taken = email_taken(value)
+        if taken:
             raise serializers.ValidationError("Email already registered.")
         return value.lower()
 
     def validate_username(self, value):
-        if User.objects.filter(username=value).exists():
+        with use_replica():
+            taken = username_taken(value)
+        if taken:
             raise serializers.ValidationError("Username already taken.")
         return value
 
@@ -54,11 +68,13 @@ class RegistrationSerializer(serializers.Serializer):
         return value
 
     def validate_experience_proof(self, file):
-        allowed = ["application/pdf", "image/jpeg", "image/png"]
-        if file.content_type not in allowed:
-            raise serializers.ValidationError(
-                "Only PDF, JPG, or PNG files are allowed."
-            )
+        # refused while streaming (size cap / magic bytes)
+        rejection = getattr(file, "rejection", None)
+        if rejection:
+            raise serializers.ValidationError(rejection)
+
+        # extension, size and magic bytes; the client's content type is ignored
+        validate_proof_file(file)
         return file
 
     # ---------- object-level ----------
@@ -100,24 +116,139 @@ class RegistrationSerializer(serializers.Serializer):
         return attrs
 
 
+class AvailabilitySerializer(serializers.Serializer):
+    email = serializers.EmailField(required=False)
+    username = serializers.CharField(required=False, max_length=50)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Pass email and/or username.")
+        return attrs
+
+
+class PendingMentorSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    email = serializers.EmailField()
+    username = serializers.CharField()
+    full_name = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    skills = serializers.ListField(source="mentor_profile.skills")
+    years_of_experience = serializers.IntegerField(
+        source="mentor_profile.years_of_experience"
+    )
+    experience_proof = serializers.FileField(source="mentor_profile.experience_proof")
+    # the admin-only download; MEDIA_URL is not meant to serve proofs
+    experience_proof_url = serializers.SerializerMethodField()
+
+    def get_experience_proof_url(self, user):
+        return reverse("mentor-proof", args=[user.id])
+
+
+class MentorDecisionSerializer(serializers.Serializer):
+    approve = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+    reject = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+
+    MAX_DECISIONS = 500
+
+    def validate(self, attrs):
+        if not attrs["approve"] and not attrs["reject"]:
+            raise serializers.ValidationError("Nothing to decide.")
+        if set(attrs["approve"]) & set(attrs["reject"]):
+            raise serializers.ValidationError(
+                "A mentor cannot be both approved and rejected."
+            )
+        if len(attrs["approve"]) + len(attrs["reject"]) > self.MAX_DECISIONS:
+            raise serializers.ValidationError(
+                f"At most {self.MAX_DECISIONS} decisions per request."
+            )
+        return attrs
+
+
+class MentorSearchSerializer(serializers.Serializer):
+    skills = serializers.CharField(help_text="Comma-separated, e.g. django,docker")
+    min_years = serializers.IntegerField(required=False, min_value=0)
+    max_years = serializers.IntegerField(required=False, min_value=0)
+
+    MAX_SKILLS = 10
+
+    def validate_skills(self, value):
+        # stored lowercased by registration and profile updates
+        skills = list(dict.fromkeys(
+            s.strip().lower() for s in value.split(",") if s.strip()
+        ))
+        if not skills:
+            raise serializers.ValidationError("At least one skill is required.")
+        if len(skills) > self.MAX_SKILLS:
+            raise serializers.ValidationError(
+                f"At most {self.MAX_SKILLS} skills per search."
+            )
+        return skills
+
+    def validate(self, attrs):
+        if attrs.get("min_years", 0) > attrs.get("max_years", float("inf")):
+            raise serializers.ValidationError(
+                {"max_years": "Must not be less than min_years."}
+            )
+        return attrs
+
+
+class MentorCardSerializer(serializers.Serializer):
+    id = serializers.IntegerField(source="user.id")
+    username = serializers.CharField(source="user.username")
+    full_name = serializers.CharField(source="user.full_name")
+    skills = serializers.ListField(child=serializers.CharField())
+    years_of_experience = serializers.IntegerField()
+    profile_image = serializers.ImageField()
+    image_variants = serializers.SerializerMethodField()
+    matches = serializers.IntegerField()
+
+    def get_image_variants(self, profile):
+        return variant_urls(profile.image_variants)
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+
 class VerifyOTPSerializer(serializers.Serializer):
     otp_id = serializers.UUIDField()
     otp = serializers.CharField()
 
 
-class LoginSerializer(serializers.Serializer):
+class RegistrationAcceptedSerializer(serializers.Serializer):
+    status = serializers.CharField()
+    status_url = serializers.URLField()
+
+
+class RegistrationStatusSerializer(serializers.Serializer):
+    state = serializers.ChoiceField(choices=["pending", "completed", "failed"])
+    message = serializers.CharField(required=False)
+    error = serializers.CharField(required=False)
+
+
+class LoginCredentialsSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
 
+
+class LoginSerializer(LoginCredentialsSerializer):
+
     def validate(self, attrs):
         try:
-            user = User.objects.get(email=attrs["email"])
+            with use_replica(email_pin(attrs["email"])):
+                user = User.objects.get(email=attrs["email"])
         except User.DoesNotExist:
             raise serializers.ValidationError("Invalid credentials")
 
-        if not user.check_password(attrs["password"]):
+        if not check_password(user, attrs["password"]):
             raise serializers.ValidationError("Invalid credentials")
 
+        # for the login snapshot; also refreshes the claims checked below
+        attrs["version"] = read_login_claims(user)
         if not user.is_active:
             raise serializers.ValidationError("User inactive")
 
@@ -142,6 +273,8 @@ class ProfileDetailSerializer(serializers.Serializer):
         required=False
     )
     profile_image = serializers.ImageField(required=False)
+    # {"96": {"webp": url, "jpeg": url}, "256": ..., "512": ...}
+    image_variants = serializers.DictField(required=False)
 
     # ---- Mentor-only ----
     years_of_experience = serializers.IntegerField(required=False)
@@ -162,13 +295,13 @@ class ProfileUpdateSerializer(serializers.Serializer):
 
     def validate_username(self, value):
         user = self.context["request"].user
-        if User.objects.exclude(id=user.id).filter(username=value).exists():
+        if username_taken(value, exclude_user_id=user.id):
             raise serializers.ValidationError("Username already taken")
         return value
 
     def update(self, instance, validated_data):
         """
-        instance = request.user
+        instance = request.user.get_user(), a fresh User row
         """
 
         # ---- USER TABLE ----
@@ -193,8 +326,37 @@ class ProfileUpdateSerializer(serializers.Serializer):
                 if s.strip()
             ]
 
-        if "profile_image" in validated_data:
+        new_image = "profile_image" in validated_data
+        stale_image = profile.profile_image.name
+        stale_variants = profile.image_variants
+        if new_image:
             profile.profile_image = validated_data["profile_image"]
+            # the old thumbnails no longer match; clients get the original
+            # until the new ones are ready
+            profile.image_variants = {}
 
         profile.save()
+
+        from .profile_cache import replace_profile
+
+        # swap in the new document once the rows are committed
+        transaction.on_commit(lambda: replace_profile(instance))
+
+        if new_image:
+            from .storage import content_storage
+            from .tasks import generate_profile_image_variants
+
+            if stale_image:
+                # the replaced image's reference (its thumbnails go in the task)
+                transaction.on_commit(lambda: content_storage.delete(stale_image))
+
+            # after replace_profile, so the task's invalidation comes last
+            transaction.on_commit(
+                lambda: generate_profile_image_variants.delay(
+                    profile._meta.model_name,
+                    profile.pk,
+                    profile.profile_image.name,
+                    stale_variants,
+                )
+            )
         return instance
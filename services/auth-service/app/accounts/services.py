@@ -1,8 +1,13 @@
 from django.db import transaction
+from django.db.models import Case, ExpressionWrapper, IntegerField, Value, When
 from django.contrib.auth import get_user_model
 
 from .models import DeveloperProfile, MentorProfile
 from .otp_service import verify_otp
+from .authentication import bump_user_version
+from .mail import queue_many
+from .routers import email_pin, pin_primary, user_pin
+from .storage import content_storage
 
 User = get_user_model()
 
@@ -46,3 +51,187 @@ def register_user_after_otp(validated_data, otp):
 
     user.save()
     return user
+
+
+def registration_payload(data, password_hash):
+    """
+    Pending registration stored with the OTP challenge until it is verified.
+    """
+    # the proof was streamed to its final location by the upload handler
+    proof = data.get("experience_proof") if data["role"] == User.Role.MENTOR else None
+
+    return {
+        "email": data["email"],
+        "username": data["username"],
+        "full_name": data["full_name"],
+        "password": password_hash,
+        "phone": data.get("phone"),
+        "role": data["role"],
+        "skills": data.get("skills"),
+        "years_of_experience": data.get("years_of_experience"),
+        "experience_proof_name": proof.storage_name if proof else None,
+        "experience_proof_sha256": proof.sha256 if proof else None,
+    }
+
+
+@transaction.atomic
+def create_registered_user(data):
+    """
+    Creates the user and role profile from a verified registration payload,
+    together or not at all; a mentor's proof is already in place and is only
+    referenced.
+    Raises IntegrityError if the email or username was taken meanwhile.
+    """
+    user = User.objects.create(
+        email=data["email"],
+        username=data["username"],
+        full_name=data["full_name"],
+        password=data["password"],
+        phone=data["phone"] or "",
+        role=data["role"],
+        is_verified=True,
+        is_active=True,
+        is_approved=(data["role"] != User.Role.MENTOR),  # ✅ FIX
+    )
+
+    if user.role == User.Role.DEVELOPER:
+        DeveloperProfile.objects.create(
+            user=user,
+            skills=data["skills"],
+        )
+
+    else:
+        MentorProfile.objects.create(
+            user=user,
+            skills=data["skills"],
+            years_of_experience=data["years_of_experience"],
+            experience_proof=data["experience_proof_name"],
+        )
+        # the profile's own reference; the pending registration's is
+        # released once this commits
+        content_storage.retain(data["experience_proof_name"])
+
+    return user
+
+
+def registration_message(user):
+    if user.role == User.Role.MENTOR:
+        return "Registration completed. Await admin approval."
+    return "Registration completed successfully"
+
+
+# ---------- mentor approval ----------
+
+def pending_mentors():
+    # matches pending_mentor_idx; the profile comes in the same query
+    return (
+        User.objects.filter(
+            role=User.Role.MENTOR, is_approved=False, is_active=True
+        )
+        .select_related("mentor_profile")
+        .order_by("created_at", "id")
+    )
+
+
+def apply_mentor_decisions(approve_ids, reject_ids):
+    """
+    Approves or rejects pending mentors with one bulk_update. Rejected
+    mentors are deactivated, which also takes them off the queue.
+    Returns (approved, rejected) lists of users; ids that are not pending
+    are ignored.
+    """
+    decisions = dict.fromkeys(approve_ids, True)
+    decisions.update(dict.fromkeys(reject_ids, False))
+
+    with transaction.atomic():
+        users = list(
+            User.objects.filter(
+                id__in=decisions,
+                role=User.Role.MENTOR,
+                is_approved=False,
+                is_active=True,
+            )
+            .select_for_update()
+            .only("id", "email", "full_name", "is_approved", "is_active")
+        )
+        if not users:
+            return [], []
+
+        for user in users:
+            if decisions[user.id]:
+                user.is_approved = True
+            else:
+                user.is_active = False
+
+        User.objects.bulk_update(users, ["is_approved", "is_active"])
+
+        approved = [user for user in users if user.is_approved]
+        rejected = [user for user in users if not user.is_active]
+
+        # bulk_update skips post_save, so do what the signals would have
+        user_ids = [user.id for user in users]
+        pins = [user_pin(user.id) for user in users]
+        pins += [email_pin(user.email) for user in users]
+
+        def invalidate():
+            bump_user_version(*user_ids)
+            pin_primary(*pins)
+
+        transaction.on_commit(invalidate)
+        transaction.on_commit(
+            lambda: queue_many(
+                [mentor_decision_email(user, True) for user in approved]
+                + [mentor_decision_email(user, False) for user in rejected]
+            )
+        )
+
+    return approved, rejected
+
+
+def mentor_decision_email(user, approved):
+    if approved:
+        return (
+            user.email,
+            "Your mentor account is approved",
+            f"Hi {user.full_name}, your mentor account has been approved. "
+            "You can now log in.",
+        )
+    return (
+        user.email,
+        "Your mentor application",
+        f"Hi {user.full_name}, your mentor application was not approved.",
+    )
+
+
+# ---------- mentor search ----------
+
+def search_mentors(skills, min_years=None, max_years=None):
+    """
+    Approved mentors with any of the (lowercased) skills, best match first.
+    The ?| filter is answered from mentor_skills_gin; the match count is only
+    computed for the rows it returns.
+    """
+    matches = sum(
+        (
+            Case(When(skills__contains=[skill], then=Value(1)), default=Value(0))
+            for skill in skills
+        ),
+        Value(0),
+    )
+
+    mentors = MentorProfile.objects.filter(
+        skills__has_any_keys=skills,
+        user__role=User.Role.MENTOR,
+        user__is_approved=True,
+        user__is_active=True,
+    )
+    if min_years is not None:
+        mentors = mentors.filter(years_of_experience__gte=min_years)
+    if max_years is not None:
+        mentors = mentors.filter(years_of_experience__lte=max_years)
+
+    return (
+        mentors.select_related("user")
+        .annotate(matches=ExpressionWrapper(matches, output_field=IntegerField()))
+        .order_by("-matches", "-years_of_experience", "id")
+    )
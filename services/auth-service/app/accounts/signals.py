@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import bump_user_version
+from .availability import index_user, unindex_user
+from .metrics import time_query
+from .models import DeveloperProfile, MentorProfile, User
+from .routers import email_pin, pin_primary, user_pin
+from .storage import content_storage
+
+
+@receiver(post_save, sender=User)
+def invalidate_token_claims(sender, instance, created, **kwargs):
+    if created or not instance.claims_changed():
+        return
+
+    instance._loaded_claims = instance.claim_values()
+    user_id = instance.pk
+    transaction.on_commit(lambda: bump_user_version(user_id))
+
+
+@receiver(post_save, sender=User)
+def update_availability_index(sender, instance, created, **kwargs):
+    names = instance.name_values()
+    old_names = getattr(instance, "_loaded_names", (None, None))
+    if not created and names == old_names:
+        return
+
+    instance._loaded_names = names
+    transaction.on_commit(lambda: index_user(*names, *old_names))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=DeveloperProfile)
+@receiver(post_save, sender=MentorProfile)
+def pin_reads_to_primary(sender, instance, **kwargs):
+    # the writer's next reads must not come from a lagging replica
+    if sender is User:
+        pins = [user_pin(instance.pk)]
+        if instance.__dict__.get("email"):
+            pins.append(email_pin(instance.email))
+    else:
+        pins = [user_pin(instance.user_id)]
+    transaction.on_commit(lambda: pin_primary(*pins))
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user(sender, instance, **kwargs):
+    user_id = instance.pk
+    names = (instance.email, instance.username)
+
+    def cleanup():
+        bump_user_version(user_id)
+        unindex_user(*names)
+
+    transaction.on_commit(cleanup)
+
+
+@receiver(post_delete, sender=DeveloperProfile)
+@receiver(post_delete, sender=MentorProfile)
+def release_profile_files(sender, instance, **kwargs):
+    # each name is one reference in content storage
+    names = [instance.profile_image.name]
+    for formats in instance.image_variants.values():
+        names.extend(formats.values())
+    if sender is MentorProfile:
+        names.append(instance.experience_proof.name)
+
+    def release():
+        for name in filter(None, names):
+            content_storage.delete(name)
+
+    transaction.on_commit(release)
+
+
+# ---------- metrics hooks ----------
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
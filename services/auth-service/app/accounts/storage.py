@@ -0,0 +1,135 @@
+"""
+Content-addressed file storage for proofs, profile images and thumbnails.
+
+A file is kept once per distinct content, at blobs/ab/cd/<sha256><ext>
+under MEDIA_ROOT, and a StoredBlob row counts what points at it: model
+fields, and pending registrations holding a proof until their OTP is
+verified. Saving content that is already stored only adds a reference;
+deleting drops one, and the file goes with the last.
+
+Names from before content addressing have no row and are handled as plain
+files.
+"""
+import hashlib
+import os
+import tempfile
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+BLOB_DIR = "blobs"
+
+
+def blob_name(sha256, ext):
+    return f"{BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext.lower()}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    The row lock on a StoredBlob serializes writers of one content: the
+    first reference writes the file while its new row is still locked, the
+    last removes it before its delete commits.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        sha256 = digest.hexdigest()
+        name = blob_name(sha256, os.path.splitext(name)[1])
+
+        with transaction.atomic():
+            stored = self.add_reference(name, sha256, content.size)
+            if not stored or not self.exists(name):
+                self.write(name, content)
+        return name
+
+    def adopt(self, temp_name, sha256, ext):
+        """
+        Files a stream already written under this storage (and hashed on the
+        way in) by its content, holding one reference. Returns the new name.
+        """
+        temp_path = self.path(temp_name)
+        name = blob_name(sha256, ext)
+
+        with transaction.atomic():
+            stored = self.add_reference(name, sha256, os.path.getsize(temp_path))
+            if stored and self.exists(name):
+                # an identical file is already stored
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+                os.replace(temp_path, self.path(name))
+        return name
+
+    def add_reference(self, name, sha256, size):
+        """
+        Counts one more reference to name. False when it is the first, and
+        the caller has to put the file in place.
+        """
+        from .models import StoredBlob
+
+        if self.retain(name):
+            return True
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.create(name=name, sha256=sha256, size=size)
+        except IntegrityError:
+            # another upload of the same content got there first
+            return self.retain(name)
+        return False
+
+    def retain(self, name):
+        """
+        One more reference to a stored name. False if it isn't stored here.
+        """
+        from .models import StoredBlob
+
+        return bool(StoredBlob.objects.filter(name=name).update(refs=F("refs") + 1))
+
+    def release(self, name):
+        """
+        Drops one reference. Returns the bytes freed (0 while others remain),
+        or None if name isn't stored here.
+        """
+        from .models import StoredBlob
+
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return None
+            if blob.refs > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(refs=F("refs") - 1)
+                return 0
+            blob.delete()
+            super().delete(name)
+            return blob.size
+
+    def delete(self, name):
+        if self.release(name) is None:
+            super().delete(name)
+
+    def write(self, name, content):
+        # written aside and renamed in, so the name never shows a partial file
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".incoming-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in content.chunks():
+                    f.write(chunk)
+            os.chmod(temp_path, self.file_permissions_mode or 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+content_storage = ContentAddressedStorage()
@@ -1,21 +1,142 @@
-from celery import shared_task
-from django.core.mail import send_mail
+import threading
+import time
+from celery import Task, shared_task
+from celery.signals import (
+    after_task_publish,
+    before_task_publish,
+    worker_process_shutdown,
+    worker_shutdown,
+)
+from django.core.mail import EmailMessage
 from django.conf import settings
+from django.db import OperationalError
+from redis.exceptions import RedisError
+from config.celery import app as celery_app  # noqa: F401  binds shared_task
+from . import mail
+from .metrics import CELERY_PUBLISH_TIME
+from .redis_client import redis_client
 
-@shared_task
+
+# ---------- publish metrics ----------
+# connected here because a process only publishes after importing its tasks
+
+# the publish in progress on this thread, as (task id, start); a publish
+# that raises never reaches after_task_publish and is overwritten by the next
+_publishing = threading.local()
+
+
+@before_task_publish.connect
+def start_publish_timer(sender=None, headers=None, **kwargs):
+    if headers and "id" in headers:
+        _publishing.current = (headers["id"], time.perf_counter())
+
+
+@after_task_publish.connect
+def observe_publish(sender=None, headers=None, **kwargs):
+    current = getattr(_publishing, "current", None)
+    _publishing.current = None
+    if current is not None and current[0] == (headers or {}).get("id"):
+        started = current[1]
+        CELERY_PUBLISH_TIME.labels(sender).observe(time.perf_counter() - started)
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def close_mail_sessions(**kwargs):
+    # QUIT instead of leaving the server to time the connections out
+    mail.sessions.close_all()
+
+
+# ---------- tasks ----------
+
+@shared_task(ignore_result=True)
+def drain_mail_outbox():
+    return mail.drain_outbox()
+
+
+# kept for messages published before the outbox existed; both now go out
+# over the worker's persistent SMTP connection
+
+@shared_task(ignore_result=True)
 def send_otp_email(email, otp):
-    send_mail(
-        subject="Your OTP",
-        message=f"Your OTP is {otp}",
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[email],
-    )
-
-@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=5)
+    subject, body = mail.otp_subject_and_body(otp)
+    with mail.sessions.checkout() as mail_session:
+        mail_session.send(
+            EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [email])
+        )
+
+@shared_task(bind=True, ignore_result=True, autoretry_for=(Exception,), retry_backoff=5)
 def send_otp_email_task(self, email, otp):
-    send_mail(
-        subject="Your Login OTP",
-        message=f"Your OTP is {otp}",
-        from_email=None,
-        recipient_list=[email],
-    )
\ No newline at end of file
+    subject, body = mail.otp_subject_and_body(otp, login=True)
+    with mail.sessions.checkout() as mail_session:
+        mail_session.send(EmailMessage(subject, body, None, [email]))
+
+
+@shared_task(ignore_result=True)
+def generate_profile_image_variants(model_name, profile_id, image_name, stale=None):
+    """
+    Builds thumbnails for a just-uploaded profile image, then drops the ones
+    made for the image it replaced.
+    """
+    from django.apps import apps
+    from .images import delete_variants, generate_variants
+    from .profile_cache import invalidate_profile
+
+    model = apps.get_model("accounts", model_name)
+    profile = model.objects.filter(pk=profile_id).only("user_id").first()
+
+    if profile is not None:
+        variants = generate_variants(image_name)
+        # a newer upload may have landed meanwhile; its own task wins
+        updated = model.objects.filter(pk=profile_id, profile_image=image_name).update(
+            image_variants=variants
+        )
+        if updated:
+            invalidate_profile(profile.user_id)
+        else:
+            delete_variants(variants)
+
+    delete_variants(stale or {})
+
+
+class FinalizeRegistrationTask(Task):
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        # out of retries, or an error retrying won't fix
+        from .registration import give_up
+
+        give_up(args[0])
+
+
+@shared_task(
+    base=FinalizeRegistrationTask,
+    ignore_result=True,
+    autoretry_for=(OperationalError, RedisError),
+    retry_backoff=2,
+    max_retries=5,
+)
+def finalize_registration(otp_id):
+    """
+    User + profile for a verified registration; see accounts.registration.
+    """
+    from .registration import finalize
+
+    finalize(otp_id)
+
+
+@shared_task(ignore_result=True)
+def reap_orphan_uploads():
+    from .reaper import reap_orphan_uploads as reap
+
+    return reap()
+
+
+@shared_task(ignore_result=True)
+def latency_probe(results_key, enqueued_at, work_ms=0):
+    """
+    Used by bench_celery_latency. Holds the worker for work_ms to stand in
+    for an SMTP send, then records the enqueue-to-sent latency.
+    """
+    if work_ms:
+        time.sleep(work_ms / 1000)
+    redis_client.rpush(results_key, time.time() - enqueued_at)
@@ -0,0 +1,179 @@
+"""
+Sliding-window rate limits kept in Redis, usable as DRF throttle classes.
+
+Each limited key is a sorted set of request timestamps. One Lua call drops
+entries older than the window, counts the rest and either records the new
+request or reports how long until the oldest one leaves the window, so
+every app server shares one exact count and one clock (Redis TIME).
+"""
+import uuid
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+from .redis_client import redis_client, async_redis_client
+
+# KEYS[1] zset of request timestamps (ms)
+# ARGV[1] window (ms), ARGV[2] limit, ARGV[3] unique member for this request
+# returns {1, 0} when allowed, {0, ms until a slot frees up} when not
+SLIDING_WINDOW_LUA = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window = tonumber(ARGV[1])
+
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", now - window)
+if redis.call("ZCARD", KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call("ZADD", KEYS[1], now, ARGV[3])
+    redis.call("PEXPIRE", KEYS[1], window)
+    return {1, 0}
+end
+
+local oldest = redis.call("ZRANGE", KEYS[1], 0, 0, "WITHSCORES")
+return {0, tonumber(oldest[2]) + window - now}
+"""
+
+sliding_window_script = redis_client.register_script(SLIDING_WINDOW_LUA)
+async_sliding_window_script = async_redis_client.register_script(SLIDING_WINDOW_LUA)
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """
+    "5/m", "20/hour", "100/10m" -> (limit, window seconds)
+    """
+    count, period = rate.split("/")
+    multiplier = int(period[:-1]) if period[:-1].isdigit() else 1
+    unit = period[-1] if period[:-1].isdigit() else period[0]
+    return int(count), multiplier * PERIODS[unit]
+
+
+def hit(key, limit, window):
+    """
+    Counts a request against key. Returns (allowed, seconds to wait).
+    """
+    allowed, wait_ms = sliding_window_script(
+        keys=[key], args=[window * 1000, limit, uuid.uuid4().hex]
+    )
+    return bool(allowed), wait_ms / 1000
+
+
+async def ahit(key, limit, window):
+    allowed, wait_ms = await async_sliding_window_script(
+        keys=[key], args=[window * 1000, limit, uuid.uuid4().hex]
+    )
+    return bool(allowed), wait_ms / 1000
+
+
+# ---------- DRF throttles ----------
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Subclasses set scope (looked up in DEFAULT_THROTTLE_RATES) and say what
+    to key on; requests without that value are not limited by them.
+    """
+
+    scope = None
+
+    def __init__(self):
+        self.limit, self.window = parse_rate(
+            settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"][self.scope]
+        )
+        self.wait_seconds = None
+
+    def get_ident_value(self, request, view):
+        raise NotImplementedError
+
+    def cache_key(self, request, view):
+        value = self.get_ident_value(request, view)
+        if not value:
+            return None
+        return f"rl:{self.scope}:{value}"
+
+    def allow_request(self, request, view):
+        key = self.cache_key(request, view)
+        if key is None:
+            return True
+        allowed, self.wait_seconds = hit(key, self.limit, self.window)
+        return allowed
+
+    async def aallow_request(self, request, view):
+        key = self.cache_key(request, view)
+        if key is None:
+            return True
+        allowed, self.wait_seconds = await ahit(key, self.limit, self.window)
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPThrottle(SlidingWindowThrottle):
+
+    def get_ident_value(self, request, view):
+        # REMOTE_ADDR, or X-Forwarded-For behind NUM_PROXIES proxies
+        return self.get_ident(request)
+
+
+class EmailThrottle(SlidingWindowThrottle):
+
+    def get_ident_value(self, request, view):
+        email = request.data.get("email")
+        if isinstance(email, str):
+            return email.strip().lower()
+        return None
+
+
+class OTPIdThrottle(SlidingWindowThrottle):
+
+    def get_ident_value(self, request, view):
+        otp_id = request.data.get("otp_id")
+        return str(otp_id) if otp_id else None
+
+
+class ChallengeThrottle(SlidingWindowThrottle):
+
+    def get_ident_value(self, request, view):
+        return request.COOKIES.get("challenge_id")
+
+
+class RegisterIPThrottle(IPThrottle):
+    scope = "register_ip"
+
+
+class RegisterEmailThrottle(EmailThrottle):
+    scope = "register_email"
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = "login_ip"
+
+
+class LoginEmailThrottle(EmailThrottle):
+    scope = "login_email"
+
+
+class VerifyOTPIPThrottle(IPThrottle):
+    scope = "verify_otp_ip"
+
+
+class VerifyOTPThrottle(OTPIdThrottle):
+    scope = "verify_otp"
+
+
+class VerifyLoginOTPIPThrottle(IPThrottle):
+    scope = "verify_login_otp_ip"
+
+
+class VerifyLoginOTPThrottle(ChallengeThrottle):
+    scope = "verify_login_otp"
+
+
+class AvailabilityIPThrottle(IPThrottle):
+    scope = "availability_ip"
+
+
+REGISTER_THROTTLES = [RegisterIPThrottle, RegisterEmailThrottle]
+LOGIN_THROTTLES = [LoginIPThrottle, LoginEmailThrottle]
+VERIFY_OTP_THROTTLES = [VerifyOTPIPThrottle, VerifyOTPThrottle]
+VERIFY_LOGIN_OTP_THROTTLES = [VerifyLoginOTPIPThrottle, VerifyLoginOTPThrottle]
+# also keeps the endpoint from being a cheap way to enumerate accounts
+AVAILABILITY_THROTTLES = [AvailabilityIPThrottle]
@@ -0,0 +1,91 @@
+"""
+Refresh-token families in Redis, replacing simplejwt's blacklist tables.
+
+Each login starts a family: rt:fam:<id> holds the user and the jti of the
+one refresh token currently allowed to rotate, and expires with it. Using a
+refresh token swaps in the next jti. Presenting a jti that was already
+rotated away means the token leaked, so the whole family is revoked.
+"""
+import uuid
+from django.conf import settings
+from rest_framework_simplejwt.settings import api_settings
+from .redis_client import redis_client
+
+FAMILY_KEY = "rt:fam:{}"
+# jtis of refresh tokens minted before families existed and since revoked
+REVOKED_JTI_KEY = "rt:revoked:{}"
+FAMILY_CLAIM = "fam"
+
+# rotation outcomes
+ROTATED = "rotated"
+REVOKED = "revoked"
+REUSED = "reused"
+
+# KEYS[1] family hash: user, jti
+# ARGV[1] jti presented, ARGV[2] jti of the replacement, ARGV[3] ttl seconds
+ROTATE_LUA = """
+local current = redis.call("HGET", KEYS[1], "jti")
+if not current then
+    return {0}
+end
+if current ~= ARGV[1] then
+    redis.call("DEL", KEYS[1])
+    return {2}
+end
+redis.call("HSET", KEYS[1], "jti", ARGV[2])
+redis.call("EXPIRE", KEYS[1], ARGV[3])
+return {1, redis.call("HGET", KEYS[1], "user")}
+"""
+
+rotate_script = redis_client.register_script(ROTATE_LUA)
+
+_STATUS = {0: REVOKED, 1: ROTATED, 2: REUSED}
+
+
+def refresh_ttl():
+    return int(settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"].total_seconds())
+
+
+def new_family_id():
+    return uuid.uuid4().hex
+
+
+def start_family(family_id, user_id, jti):
+    key = FAMILY_KEY.format(family_id)
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hset(key, mapping={"user": user_id, "jti": jti})
+        pipe.expire(key, refresh_ttl())
+        pipe.execute()
+
+
+def rotate(family_id, jti, next_jti):
+    """
+    Returns (status, user_id); user_id is only set when status is ROTATED.
+    """
+    result = rotate_script(
+        keys=[FAMILY_KEY.format(family_id)], args=[jti, next_jti, refresh_ttl()]
+    )
+    user_id = result[1] if len(result) > 1 else None
+    return _STATUS[result[0]], user_id
+
+
+def revoke_family(family_id):
+    redis_client.delete(FAMILY_KEY.format(family_id))
+
+
+def consume_legacy_jti(jti, ttl):
+    """
+    Single use for a refresh token minted before families: False if it was
+    blacklisted or already exchanged.
+    """
+    return bool(
+        redis_client.set(REVOKED_JTI_KEY.format(jti), 1, nx=True, ex=max(ttl, 1))
+    )
+
+
+def family_of(token):
+    return token.get(FAMILY_CLAIM)
+
+
+def jti_of(token):
+    return token[api_settings.JTI_CLAIM]
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import time
+import uuid
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from .redis_client import redis_client
+from .storage import content_storage
+from .validators import MAX_FILE_SIZE_MB, MAGIC_BYTES_LENGTH, sniff_content_type
+
+PROOF_FIELD = "experience_proof"
+# streamed here, then filed by content once the registration is valid
+INCOMING_DIR = "uploads/incoming"
+MAX_PROOF_SIZE = MAX_FILE_SIZE_MB * 1024 * 1024
+
+# stored names get the extension of what the bytes are, not what the client said
+PROOF_EXTENSIONS = {
+    "application/pdf": ".pdf",
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+}
+
+# zset of "<otp_id>|<storage_name>" scored by when the registration expires
+PENDING_UPLOADS_KEY = "uploads:pending"
+# verify-otp consumes the OTP key, then writes reg:payload in a later round
+# trip; an OTP verified just before expiry must not look abandoned in between
+# (also covers clock skew between app servers and the reaper)
+PENDING_UPLOAD_GRACE = 60
+
+
+class StreamedProofFile(UploadedFile):
+    """
+    A proof already written under MEDIA_ROOT, in the incoming directory
+    until keep_upload() files it in content storage.
+
+    content_type is sniffed from the magic bytes, not taken from the client.
+    rejection holds the reason when the stream was refused part way.
+    """
+
+    def __init__(self, file, name, storage_name, content_type, size, sha256,
+                 rejection=None):
+        super().__init__(file, name, content_type, size)
+        self.storage_name = storage_name
+        self.sha256 = sha256
+        self.rejection = rejection
+        self.kept = False
+
+    def close(self):
+        # rejected streams have nothing left open
+        if self.file is not None:
+            self.file.close()
+
+    def keep(self):
+        self.close()
+        self.storage_name = content_storage.adopt(
+            self.storage_name, self.sha256, PROOF_EXTENSIONS[self.content_type]
+        )
+        self.kept = True
+
+    def discard(self):
+        self.close()
+        if self.kept:
+            content_storage.release(self.storage_name)
+        elif self.storage_name:
+            try:
+                os.remove(os.path.join(settings.MEDIA_ROOT, self.storage_name))
+            except FileNotFoundError:
+                pass
+        self.storage_name = None
+
+
+def keep_upload(file):
+    """
+    Files a validated proof by its content. The pending registration holds
+    that reference until it is finalized or expires.
+    """
+    if isinstance(file, StreamedProofFile) and file.storage_name:
+        file.keep()
+
+
+def discard_upload(file):
+    if isinstance(file, StreamedProofFile):
+        file.discard()
+
+
+def track_pending_upload(pipe, otp_id, storage_name, ttl):
+    due = time.time() + ttl + PENDING_UPLOAD_GRACE
+    pipe.zadd(PENDING_UPLOADS_KEY, {f"{otp_id}|{storage_name}": due})
+
+
+def release_pending_upload(otp_id, storage_name):
+    """
+    Drops a pending registration's reference to its proof. Whoever removes
+    the tracking entry (finalize or the reaper) releases it, so it happens
+    once. Returns the bytes freed, or None for proofs stored before content
+    addressing, which the caller handles.
+    """
+    if not redis_client.zrem(PENDING_UPLOADS_KEY, f"{otp_id}|{storage_name}"):
+        return 0
+    return content_storage.release(storage_name)
+
+
+class ExperienceProofUploadHandler(FileUploadHandler):
+    """
+    Claims the experience_proof part and streams it straight to
+    MEDIA_ROOT/uploads/incoming/, sniffing its type, enforcing the size cap
+    and hashing it on the way. Other file fields fall through to the default
+    handlers.
+    """
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.active = field_name == PROOF_FIELD
+        if not self.active:
+            return
+
+        self.storage_name = f"{INCOMING_DIR}/{uuid.uuid4()}"
+
+        path = os.path.join(settings.MEDIA_ROOT, self.storage_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.file = open(path, "wb+")
+        self.sha256 = hashlib.sha256()
+        self.head = b""
+        self.sniffed_type = None
+        self.size = 0
+        self.rejection = None
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if self.rejection:
+            # keep draining the request body, but stop storing it
+            return None
+
+        self.size += len(raw_data)
+        if self.size > MAX_PROOF_SIZE:
+            self.reject(f"File size must be under {MAX_FILE_SIZE_MB} MB.")
+            return None
+
+        if self.sniffed_type is None and len(self.head) < MAGIC_BYTES_LENGTH:
+            self.head += raw_data[:MAGIC_BYTES_LENGTH]
+            if len(self.head) >= MAGIC_BYTES_LENGTH:
+                if not self.sniff():
+                    return None
+
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+
+        if not self.rejection and self.sniffed_type is None:
+            self.sniff()
+
+        if self.rejection:
+            return StreamedProofFile(
+                None, self.file_name, None, None, self.size, None, self.rejection
+            )
+
+        self.file.flush()
+        self.file.seek(0)
+        return StreamedProofFile(
+            self.file,
+            self.file_name,
+            self.storage_name,
+            self.sniffed_type,
+            self.size,
+            self.sha256.hexdigest(),
+        )
+
+    def sniff(self):
+        self.sniffed_type = sniff_content_type(self.head)
+        if self.sniffed_type is None:
+            self.reject("Only PDF, JPG, or PNG files are allowed.")
+            return False
+        return True
+
+    def reject(self, message):
+        self.rejection = message
+        self.file.close()
+        os.remove(self.file.name)
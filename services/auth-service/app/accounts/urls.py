@@ -1,12 +1,43 @@
 # accounts/urls.py
 
+from django.conf import settings
 from django.urls import path
 from accounts import views
 
-urlpatterns = [
-     path("register/", views.RegisterAPIView.as_view()),
-    path("verify-otp/", views.VerifyOTPAPIView.as_view()),
-    path("login/", views.LoginAPIView.as_view()),
-    path("verify-login-otp/", views.VerifyLoginOTPAPIView.as_view()),
-    path("profile/", views.ProfileUpdateAPIView.as_view(), name="profile-update"),
-]
+
+def auth_urlpatterns(auth_views):
+    return [
+        path("register/", auth_views.RegisterAPIView.as_view()),
+        path("verify-otp/", auth_views.VerifyOTPAPIView.as_view()),
+        path(
+            "register/status/<uuid:otp_id>/",
+            views.RegistrationStatusAPIView.as_view(),
+            name="registration-status",
+        ),
+        path("login/", auth_views.LoginAPIView.as_view()),
+        path("verify-login-otp/", auth_views.VerifyLoginOTPAPIView.as_view()),
+        path("token/refresh/", views.TokenRefreshAPIView.as_view()),
+        path("logout/", views.LogoutAPIView.as_view()),
+        path("check-availability/", views.CheckAvailabilityAPIView.as_view()),
+        path("profile/", views.ProfileUpdateAPIView.as_view(), name="profile-update"),
+        path("mentors/search/", views.MentorSearchAPIView.as_view()),
+        path("admin/mentors/pending/", views.PendingMentorsAPIView.as_view()),
+        path("admin/mentors/decisions/", views.MentorDecisionsAPIView.as_view()),
+        path(
+            "admin/mentors/<int:user_id>/proof/",
+            views.MentorProofDownloadAPIView.as_view(),
+            name="mentor-proof",
+        ),
+    ]
+
+
+if settings.ASYNC_AUTH_VIEWS:
+    from accounts import async_views
+
+    urlpatterns = auth_urlpatterns(async_views)
+else:
+    urlpatterns = auth_urlpatterns(views)
+
+# the async views are plain Django views, invisible to the schema generator;
+# the DRF ones document the same endpoints (see config.schema_urls)
+schema_urlpatterns = auth_urlpatterns(views)
@@ -4,6 +4,28 @@ import os
 ALLOWED_EXTENSIONS = [".pdf", ".jpg", ".jpeg", ".png"]
 MAX_FILE_SIZE_MB = 5
 
+MAGIC_NUMBERS = [
+    (b"%PDF-", "application/pdf"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+]
+MAGIC_BYTES_LENGTH = max(len(magic) for magic, _ in MAGIC_NUMBERS)
+
+
+def sniff_content_type(head):
+    for magic, content_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return content_type
+    return None
+
+
+def read_head(file):
+    position = file.tell()
+    file.seek(0)
+    head = file.read(MAGIC_BYTES_LENGTH)
+    file.seek(position)
+    return head
+
 
 def validate_experience_proof(file):
     ext = os.path.splitext(file.name)[1].lower()
@@ -17,3 +39,8 @@ def validate_experience_proof(file):
         raise ValidationError(
             f"File size must be under {MAX_FILE_SIZE_MB} MB."
         )
+
+    if sniff_content_type(read_head(file)) is None:
+        raise ValidationError(
+            "Only PDF, JPG, JPEG, and PNG files are allowed."
+        )
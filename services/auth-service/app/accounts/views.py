@@ -1,23 +1,78 @@
-import uuid, json, random, os, shutil
-from django.contrib.auth.hashers import make_password
-from django.db import IntegrityError
+import os
+import secrets
+import uuid
 from django.conf import settings
+from django.db.models import Q
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .serializers import (
     RegistrationSerializer,
     VerifyOTPSerializer,
+    RegistrationAcceptedSerializer,
+    RegistrationStatusSerializer,
     LoginSerializer,
     VerifyLoginOTPSerializer,
     ProfileUpdateSerializer,
-    ProfileDetailSerializer,
+    AvailabilitySerializer,
+    RefreshTokenSerializer,
+    PendingMentorSerializer,
+    MentorDecisionSerializer,
+    MentorSearchSerializer,
+    MentorCardSerializer,
+)
+from .mail import queue_otp_email
+from .utils import generate_otp
+from .uploads import ExperienceProofUploadHandler, discard_upload, keep_upload
+from .models import MentorProfile, User
+from .services import (
+    registration_payload,
+    pending_mentors,
+    apply_mentor_decisions,
+    search_mentors,
+)
+from .otp_service import (
+    OTP_EXPIRED,
+    OTP_VERIFIED,
+    MESSAGES,
+    store_register_challenge,
+    verify_register_challenge,
+    store_login_challenge,
+    verify_login_challenge,
+)
+from .authentication import (
+    get_user_version,
+    login_context,
+    read_login_context,
+    snapshot_user,
+)
+from .jwt import generate_tokens, rotate_tokens, revoke_tokens
+from .hashing import make_password
+from .profile_cache import get_profile, fill_profile
+from .availability import email_taken, username_taken
+from .pagination import (
+    encode_cursor,
+    decode_cursor,
+    cursor_datetime,
+    cursor_int,
+    page_limit,
+)
+from .permissions import IsAdmin
+from .downloads import serve_protected
+from .registration import PENDING, queue_finalization, registration_status
+from .routers import use_replica, user_pin
+from .metrics import render as render_metrics
+from . import schema
+from .throttling import (
+    REGISTER_THROTTLES,
+    LOGIN_THROTTLES,
+    VERIFY_OTP_THROTTLES,
+    VERIFY_LOGIN_OTP_THROTTLES,
+    AVAILABILITY_THROTTLES,
 )
-from .tasks import send_otp_email, send_otp_email_task
-from .utils import save_temp_file, hash_otp, generate_otp
-from .models import User, DeveloperProfile, MentorProfile
-from .redis_client import redis_client
-from .jwt import generate_tokens
 from rest_framework.parsers import MultiPartParser, FormParser
 from drf_spectacular.utils import extend_schema
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -26,6 +81,17 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 class RegisterAPIView(APIView):
     permission_classes = [AllowAny]
     parser_classes = [MultiPartParser, FormParser]
+    throttle_classes = REGISTER_THROTTLES
+
+    def initialize_request(self, request, *args, **kwargs):
+        # mentor proofs are streamed to their final location as they arrive
+        request.upload_handlers.insert(0, ExperienceProofUploadHandler(request))
+        return super().initialize_request(request, *args, **kwargs)
+
+    def throttled(self, request, wait):
+        # the email throttle parsed the body, so the proof is already on disk
+        discard_upload(request.data.get("experience_proof"))
+        super().throttled(request, wait)
 
     @extend_schema(
         request=RegistrationSerializer,
@@ -34,33 +100,28 @@ class RegisterAPIView(APIView):
     )
     def post(self, request):
         serializer = RegistrationSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        data = serializer.validated_data
 
-        otp = random.randint(100000, 999999)
-        otp_id = str(uuid.uuid4())
+        try:
+            serializer.is_valid(raise_exception=True)
+            data = serializer.validated_data
+
+            if data["role"] != User.Role.MENTOR:
+                discard_upload(data.get("experience_proof"))
+            else:
+                keep_upload(data.get("experience_proof"))
 
-        temp_file_path = None
-        if data["role"] == User.Role.MENTOR:
-            temp_file_path = save_temp_file(data["experience_proof"], "mentor")
+            otp = generate_otp()
+            otp_id = str(uuid.uuid4())
 
-        payload = {
-            "email": data["email"],
-            "username": data["username"],
-            "full_name": data["full_name"],
-            "password": make_password(data["password"]),
-            "phone": data.get("phone"),
-            "role": data["role"],
-            "skills": data.get("skills"),
-            "years_of_experience": data.get("years_of_experience"),
-            "experience_proof_path": temp_file_path,
-            "otp": str(otp),
-        }
+            payload = registration_payload(data, make_password(data["password"]))
 
-        redis_key = f"otp:register:{otp_id}"
-        redis_client.setex(redis_key, 300, json.dumps(payload))
+            store_register_challenge(otp_id, otp, payload)
+        except Exception:
+            # no pending registration references the streamed proof
+            discard_upload(request.data.get("experience_proof"))
+            raise
 
-        send_otp_email.delay(data["email"], otp)
+        queue_otp_email(data["email"], otp)
 
         return Response(
             {"otp_id": otp_id, "message": "OTP sent"},
@@ -70,7 +131,13 @@ class RegisterAPIView(APIView):
 
 class VerifyOTPAPIView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = VERIFY_OTP_THROTTLES
 
+    @extend_schema(
+        request=VerifyOTPSerializer,
+        responses={202: RegistrationAcceptedSerializer},
+        tags=["Auth"],
+    )
     def post(self, request):
         serializer = VerifyOTPSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -78,68 +145,48 @@ class VerifyOTPAPIView(APIView):
         otp_id = serializer.validated_data["otp_id"]  # ✅ FIX
         otp = serializer.validated_data["otp"]
 
-        redis_key = f"otp:register:{otp_id}"
-        raw = redis_client.get(redis_key)
+        result, data = verify_register_challenge(otp_id, otp)
 
-        if not raw:
+        if result == OTP_EXPIRED:
             return Response({"error": "OTP expired"}, status=400)
 
-        data = json.loads(raw)
+        if result != OTP_VERIFIED:
+            return Response({"error": MESSAGES[result]}, status=400)
 
-        if data["otp"] != otp:
-            return Response({"error": "Invalid OTP"}, status=400)
-
-        try:
-            user = User.objects.create(
-                email=data["email"],
-                username=data["username"],
-                full_name=data["full_name"],
-                password=data["password"],
-                phone=data["phone"],
-                role=data["role"],
-                is_verified=True,
-                is_active=True,
-                is_approved=(data["role"] != User.Role.MENTOR),  # ✅ FIX
-            )
-        except IntegrityError:
-            return Response(
-                {"error": "User already exists"},
-                status=400,
-            )
-
-        if user.role == User.Role.DEVELOPER:
-            DeveloperProfile.objects.create(
-                user=user,
-                skills=data["skills"],
-            )
-
-        else:
-            final_dir = os.path.join(settings.MEDIA_ROOT, "mentor_proofs")
-            os.makedirs(final_dir, exist_ok=True)
-
-            final_path = shutil.move(data["experience_proof_path"], final_dir)
-
-            MentorProfile.objects.create(
-                user=user,
-                skills=data["skills"],
-                years_of_experience=data["years_of_experience"],
-                experience_proof=final_path.replace(settings.MEDIA_ROOT + "/", ""),
-            )
-
-        redis_client.delete(redis_key)
+        # user, profile and proof are committed by the finalize_registration task
+        queue_finalization(otp_id, data)
 
+        status_url = request.build_absolute_uri(
+            reverse("registration-status", args=[otp_id])
+        )
         return Response(
-            {
-                "message": (
-                    "Registration completed. Await admin approval."
-                    if user.role == User.Role.MENTOR
-                    else "Registration completed successfully"
-                )
-            },
-            status=201,
+            {"status": PENDING, "status_url": status_url},
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": status_url},
         )
 
 
+class RegistrationStatusAPIView(APIView):
+    """
+    Polled after verify-otp: pending, then completed (with the message
+    verify-otp used to return) or failed (with the error).
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    @extend_schema(responses=RegistrationStatusSerializer, tags=["Auth"])
+    def get(self, request, otp_id):
+        registration = registration_status(otp_id)
+        if registration is None:
+            return Response({"error": "Registration not found or expired"}, status=404)
+
+        response = Response(registration)
+        response["Cache-Control"] = "no-store"
+        if registration["state"] == PENDING:
+            response["Retry-After"] = "1"
+        return response
+
+
 import uuid
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -148,12 +195,14 @@ from rest_framework import status
 
 class LoginAPIView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = LOGIN_THROTTLES
 
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         user = serializer.validated_data["user"]
+        version = serializer.validated_data["version"]
         if user.role == User.Role.MENTOR and not user.is_approved:
             return Response(
                 {"detail": "Mentor account not approved yet"},
@@ -163,13 +212,12 @@ class LoginAPIView(APIView):
         otp = generate_otp()
         challenge_id = str(uuid.uuid4())
 
-        # store OTP
-        redis_client.setex(f"otp:{challenge_id}", 300, hash_otp(otp))
-
-        # store login context
-        redis_client.setex(f"login_ctx:{challenge_id}", 300, user.id)
+        # store OTP + claims snapshot (one round trip)
+        store_login_challenge(
+            challenge_id, otp, login_context(user, version)
+        )
 
-        send_otp_email_task.delay(user.email, otp)
+        queue_otp_email(user.email, otp, login=True)
 
         response = Response({"otp_required": True}, status=status.HTTP_200_OK)
 
@@ -188,6 +236,7 @@ class LoginAPIView(APIView):
 
 class VerifyLoginOTPAPIView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = VERIFY_LOGIN_OTP_THROTTLES
 
     def post(self, request):
         serializer = VerifyLoginOTPSerializer(data=request.data)
@@ -199,27 +248,31 @@ class VerifyLoginOTPAPIView(APIView):
         if not challenge_id:
             return Response({"detail": "Login expired"}, status=400)
 
-        user_id = redis_client.get(f"login_ctx:{challenge_id}")
-        stored_otp = redis_client.get(f"otp:{challenge_id}")
+        # checks, counts the attempt and consumes the challenge atomically
+        result, context = verify_login_challenge(challenge_id, otp)
 
-        if not user_id or not stored_otp:
+        if result == OTP_EXPIRED:
             return Response({"detail": "Login expired"}, status=400)
 
-        if stored_otp != hash_otp(otp):
-            return Response({"detail": "Invalid OTP"}, status=400)
+        if result != OTP_VERIFIED:
+            return Response({"detail": MESSAGES[result]}, status=400)
 
-        # cleanup
-        redis_client.delete(f"otp:{challenge_id}")
-        redis_client.delete(f"login_ctx:{challenge_id}")
-
-        user = User.objects.get(id=user_id)
+        user_id, snapshot = read_login_context(context)
+        version = get_user_version(user_id)
+        # minted from the snapshot taken at login while its version is current
+        user = snapshot_user(user_id, snapshot, version)
+        if user is None:
+            # role, approval or active changed since login; the row decides
+            user = User.objects.filter(pk=user_id).first()
+            if user is None or not user.is_active:
+                return Response({"detail": "User inactive"}, status=400)
 
         if user.role == User.Role.MENTOR and not user.is_approved:
             return Response(
                 {"detail": "Mentor account not approved yet"},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        tokens = generate_tokens(user)
+        tokens = generate_tokens(user, version)
 
         response = Response({**tokens, "role": user.role}, status=status.HTTP_200_OK)
 
@@ -229,46 +282,85 @@ class VerifyLoginOTPAPIView(APIView):
         return response
 
 
-class ProfileUpdateAPIView(APIView):
-    permission_classes = [IsAuthenticated]
+class RefreshTokenAPIView(APIView):
+    """
+    Takes the refresh token in the body, so a stale access token in the
+    Authorization header is never looked at.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get_authenticate_header(self, request):
+        # keeps rejected tokens at 401 rather than DRF's 403 fallback
+        return 'Bearer realm="api"'
+
 
+class TokenRefreshAPIView(RefreshTokenAPIView):
+
+    @extend_schema(request=RefreshTokenSerializer, tags=["Auth"])
+    def post(self, request):
+        serializer = RefreshTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        tokens = rotate_tokens(serializer.validated_data["refresh"])
+        return Response(tokens, status=status.HTTP_200_OK)
+
+
+class LogoutAPIView(RefreshTokenAPIView):
+
+    @extend_schema(request=RefreshTokenSerializer, responses={204: None}, tags=["Auth"])
+    def post(self, request):
+        serializer = RefreshTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        revoke_tokens(serializer.validated_data["refresh"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CheckAvailabilityAPIView(APIView):
+    """
+    Typeahead check for the signup form: ?email=...&username=...
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = AVAILABILITY_THROTTLES
+
+    @extend_schema(parameters=[AvailabilitySerializer], tags=["Auth"])
     def get(self, request):
-        user = request.user
-
-        data = {
-            "email": user.email,
-            "username": user.username,
-            "full_name": user.full_name,
-            "phone": user.phone,
-            "role": user.role,
-        }
-
-        if user.role == User.Role.DEVELOPER:
-            profile = user.developer_profile
-            data.update(
-                {
-                    "skills": profile.skills,
-                    "profile_image": profile.profile_image,
-                }
-            )
+        serializer = AvailabilitySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
 
-        elif user.role == User.Role.MENTOR:
-            profile = user.mentor_profile
-            data.update(
-                {
-                    "skills": profile.skills,
-                    "profile_image": profile.profile_image,
-                    "years_of_experience": profile.years_of_experience,
-                    "experience_proof": profile.experience_proof,
-                }
-            )
+        result = {}
+        if "email" in data:
+            result["email"] = not email_taken(data["email"])
+        if "username" in data:
+            result["username"] = not username_taken(data["username"])
+
+        return Response(result)
+
+
+class ProfileUpdateAPIView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        serializer = ProfileDetailSerializer(data)
-        return Response(serializer.data)
+    def get(self, request):
+        cached = get_profile(request.user.id)
+        if cached is None:
+            with use_replica(user_pin(request.user.id)):
+                cached = fill_profile(request.user.get_user())
+        etag, body = cached
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        # cached per user, but always revalidated
+        response["Cache-Control"] = "private, no-cache"
+        return response
 
     def patch(self, request):
         serializer = ProfileUpdateSerializer(
-            request.user,
+            request.user.get_user(),
             data=request.data,
             partial=True,  
             context={"request": request},
@@ -279,3 +371,182 @@ class ProfileUpdateAPIView(APIView):
             {"detail": "Profile updated successfully"},
             status=status.HTTP_200_OK,
         )
+
+
+class MentorSearchAPIView(APIView):
+    """
+    ?skills=django,docker&min_years=2&max_years=10&limit=20&cursor=...
+    """
+
+    @extend_schema(
+        parameters=[MentorSearchSerializer],
+        responses=MentorCardSerializer(many=True),
+        tags=["Mentors"],
+    )
+    def get(self, request):
+        serializer = MentorSearchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        limit = page_limit(request, default=20, maximum=100)
+        mentors = search_mentors(
+            data["skills"], data.get("min_years"), data.get("max_years")
+        )
+
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            matches, years, last_id = decode_cursor(
+                cursor, cursor_int, cursor_int, cursor_int
+            )
+            mentors = mentors.filter(
+                Q(matches__lt=matches)
+                | Q(matches=matches, years_of_experience__lt=years)
+                | Q(matches=matches, years_of_experience=years, id__gt=last_id)
+            )
+
+        page = list(mentors[:limit + 1])
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            last = page[-1]
+            next_cursor = encode_cursor(last.matches, last.years_of_experience, last.id)
+
+        return Response(
+            {
+                "results": MentorCardSerializer(page, many=True).data,
+                "next_cursor": next_cursor,
+            }
+        )
+
+
+# ---------- admin: mentor approval ----------
+
+class PendingMentorsAPIView(APIView):
+    """
+    ?limit=50&cursor=<next_cursor from the previous page>
+    """
+    permission_classes = [IsAdmin]
+
+    @extend_schema(responses=PendingMentorSerializer(many=True), tags=["Admin"])
+    def get(self, request):
+        limit = page_limit(request)
+        mentors = pending_mentors()
+
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            created_at, last_id = decode_cursor(cursor, cursor_datetime, cursor_int)
+            mentors = mentors.filter(
+                Q(created_at__gt=created_at)
+                | Q(created_at=created_at, id__gt=last_id)
+            )
+
+        # one extra row tells us whether there is another page
+        page = list(mentors[:limit + 1])
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor(page[-1].created_at.isoformat(), page[-1].id)
+
+        return Response(
+            {
+                "results": PendingMentorSerializer(page, many=True).data,
+                "next_cursor": next_cursor,
+            }
+        )
+
+
+class MentorDecisionsAPIView(APIView):
+    permission_classes = [IsAdmin]
+
+    @extend_schema(request=MentorDecisionSerializer, tags=["Admin"])
+    def post(self, request):
+        serializer = MentorDecisionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        approved, rejected = apply_mentor_decisions(data["approve"], data["reject"])
+
+        decided = {user.id for user in approved + rejected}
+        return Response(
+            {
+                "approved": [user.id for user in approved],
+                "rejected": [user.id for user in rejected],
+                # already decided, not mentors, or unknown
+                "skipped": [
+                    user_id
+                    for user_id in data["approve"] + data["reject"]
+                    if user_id not in decided
+                ],
+            }
+        )
+
+
+class MentorProofDownloadAPIView(APIView):
+    """
+    A mentor's experience proof, for reviewing their application. Authorized
+    here, sent by the front proxy when one is configured (accounts.downloads).
+    """
+    permission_classes = [IsAdmin]
+
+    @extend_schema(responses={(200, "application/octet-stream"): bytes}, tags=["Admin"])
+    def get(self, request, user_id):
+        proof = (
+            MentorProfile.objects.filter(user_id=user_id)
+            .values_list("experience_proof", flat=True)
+            .first()
+        )
+        if not proof:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        filename = f"experience-proof-{user_id}{os.path.splitext(proof)[1]}"
+        return serve_protected(request, proof, filename)
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. A plain Django view: no DRF auth, throttles
+    or content negotiation in the way of a 15s scrape.
+    """
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "")
+        if not secrets.compare_digest(supplied, f"Bearer {settings.METRICS_TOKEN}"):
+            return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
+
+
+def schema_view(request):
+    """
+    The prebuilt OpenAPI document (accounts.schema), gzipped unless the client
+    can't take it, with a long max-age for gateways and an ETag to revalidate.
+    """
+    artifact = schema.get_schema()
+    response = get_conditional_response(request, etag=artifact.etag)
+    if response is None:
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            response = HttpResponse(artifact.compressed, content_type=schema.CONTENT_TYPE)
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(artifact.body, content_type=schema.CONTENT_TYPE)
+
+    response["ETag"] = artifact.etag
+    response["Cache-Control"] = f"public, max-age={settings.SCHEMA_CACHE_MAX_AGE}"
+    response["Vary"] = "Accept-Encoding"
+    return response
+
+
+_swagger_view = None
+
+
+def swagger_view(request, *args, **kwargs):
+    """
+    Swagger UI for schema_view. drf-spectacular's views module is heavy, so
+    it is imported when the docs are first opened, not at worker boot.
+    """
+    global _swagger_view
+    if _swagger_view is None:
+        from drf_spectacular.views import SpectacularSwaggerView
+
+        _swagger_view = SpectacularSwaggerView.as_view(url_name="schema")
+    return _swagger_view(request, *args, **kwargs)
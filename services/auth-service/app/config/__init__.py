@@ -1,3 +1,14 @@
-from .celery import app as celery_app
+# The Celery app is created on first access (accounts.tasks, `celery -A
+# config`) rather than while settings load, so manage.py commands and web
+# workers that haven't published a task yet don't import Celery.
 
-__all__ = ("celery_app",)
\ No newline at end of file
+
+def __getattr__(name):
+    if name == "celery_app":
+        from .celery import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ("celery_app",)
@@ -1,9 +1,9 @@
 import os
 from celery import Celery
-from dotenv import load_dotenv
-
-load_dotenv()
+from celery.signals import worker_init
 
+# .env is loaded by the settings module; worker pool and concurrency come
+# from CELERY_WORKER_PROFILE there (see ✅ CELERY WORKER PROFILES)
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
 
 app = Celery("auth_service")
@@ -11,6 +11,25 @@ app = Celery("auth_service")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
-# ✅ WINDOWS FIX
-app.conf.worker_pool = "solo"
-app.conf.worker_concurrency = 1
+
+@worker_init.connect
+def require_gevent_patching(sender=None, **kwargs):
+    """
+    The gevent pool only helps if the stdlib was monkey-patched, which
+    Celery does for `-P gevent` on the command line, not for the worker_pool
+    setting. Unpatched, every socket call blocks the hub and the greenlets
+    run one at a time.
+    """
+    pool = getattr(sender, "pool_cls", None)
+    name = pool if isinstance(pool, str) else getattr(pool, "__module__", "")
+    if "gevent" not in (name or ""):
+        return
+
+    from gevent import monkey
+
+    if not monkey.is_module_patched("socket"):
+        # SystemExit: Celery logs and swallows exceptions from signal handlers
+        raise SystemExit(
+            "The gevent pool needs a monkey-patched process; start the worker "
+            "with `celery -A config worker -P gevent`"
+        )
@@ -0,0 +1,23 @@
+"""
+Gunicorn hooks for the multiprocess Prometheus client.
+
+Workers write metric samples under PROMETHEUS_MULTIPROC_DIR; the directory
+is wiped when the master starts (stale files would be summed into every
+scrape) and a dead worker's live gauges are dropped when it exits.
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
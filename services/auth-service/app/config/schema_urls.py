@@ -0,0 +1,13 @@
+"""
+What the OpenAPI schema is generated from: the API routes of config.urls,
+with the auth endpoints always pointing at their DRF views, whichever
+implementation ASYNC_AUTH_VIEWS serves.
+"""
+
+from django.urls import path, include
+from accounts.urls import schema_urlpatterns
+
+
+urlpatterns = [
+    path("api/auth/", include(schema_urlpatterns)),
+]
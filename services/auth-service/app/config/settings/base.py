@@ -25,12 +25,13 @@ INSTALLED_APPS = [
     "drf_spectacular",
     "rest_framework",
     "rest_framework.authtoken",
-    "rest_framework_simplejwt.token_blacklist",
 ]
 
 AUTH_USER_MODEL = "accounts.User"
 
 MIDDLEWARE = [
+    # first, so its timings cover the rest of the stack
+    "accounts.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -58,8 +59,17 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
+
+# serve register/login/OTP endpoints from accounts.async_views (needs ASGI)
+ASYNC_AUTH_VIEWS = os.getenv("ASYNC_AUTH_VIEWS", "0") == "1"
 
 # ✅ DATABASE (ENV ONLY)
+# DB_POOL=1 gives each process a psycopg 3 connection pool; use it under ASGI,
+# where per-thread persistent connections would leak. Otherwise (WSGI, Celery)
+# connections are kept for DB_CONN_MAX_AGE seconds and checked before reuse.
+DB_POOL = os.getenv("DB_POOL", "0") == "1"
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -67,10 +77,35 @@ DATABASES = {
         "USER": os.getenv("POSTGRES_USER"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST", "localhost"),
-        "PORT": 5432,
+        "PORT": int(os.getenv("POSTGRES_PORT", 5432)),
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
     }
 }
 
+if DB_POOL:
+    # CONN_HEALTH_CHECKS makes the pool check each connection on checkout
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+    }
+
+# optional streaming replica for the read-only hot paths (accounts.routers)
+if os.getenv("POSTGRES_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.getenv("POSTGRES_REPLICA_HOST"),
+        "PORT": int(os.getenv("POSTGRES_REPLICA_PORT", 5432)),
+        "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["accounts.routers.ReplicaRouter"]
+# how long a user's reads stay on the primary after they write
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 5))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"
@@ -80,6 +115,29 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
+# ✅ PASSWORD HASHING
+# first entry hashes new passwords; the rest still verify (and upgrade) old ones
+PASSWORD_HASHERS = {
+    "argon2": [
+        "accounts.hashers.TunedArgon2PasswordHasher",
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    ],
+    "pbkdf2": [
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        "accounts.hashers.TunedArgon2PasswordHasher",
+    ],
+}[os.getenv("PASSWORD_HASHER", "argon2")]
+
+# OWASP baseline for Argon2id: 19 MiB, 2 iterations, 1 lane
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 2))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 19456))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 1))
+
+# hashing runs in a per-worker process pool; 0 hashes inline
+PASSWORD_HASH_POOL_SIZE = int(os.getenv("PASSWORD_HASH_POOL_SIZE", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 16))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 5))
+
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
 USE_I18N = True
@@ -88,12 +146,85 @@ USE_TZ = True
 STATIC_URL = "/static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# ✅ REDIS (OTP challenges, login context)
+REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 0.5))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", 0.5))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+REDIS_RETRIES = int(os.getenv("REDIS_RETRIES", 2))
+# pre-rendered /profile/ documents
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", 3600))
+
 # ✅ CELERY (ENV-OWNED — NO HARDCODE)
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 
+# OTP mail gets its own queue and worker so it never waits behind slow jobs
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_ROUTES = {
+    "accounts.tasks.drain_mail_outbox": {"queue": "otp"},
+    "accounts.tasks.send_otp_email": {"queue": "otp"},
+    "accounts.tasks.send_otp_email_task": {"queue": "otp"},
+    "accounts.tasks.latency_probe": {"queue": "otp"},
+}
+
+# tasks are short: take one at a time so a stalled SMTP call doesn't hold a
+# prefetched backlog, and ack after running so a killed worker's task is redelivered
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv("CELERY_PREFETCH_MULTIPLIER", 1))
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    # must exceed the longest countdown (MAIL_RETRY_DELAY) for acks_late
+    "visibility_timeout": int(os.getenv("CELERY_VISIBILITY_TIMEOUT", 3600)),
+}
+CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
+
+CELERY_BEAT_SCHEDULE = {
+    # safety net in case a drain task was lost with its worker
+    "drain-mail-outbox": {
+        "task": "accounts.tasks.drain_mail_outbox",
+        "schedule": 30,
+    },
+    "reap-orphan-uploads": {
+        "task": "accounts.tasks.reap_orphan_uploads",
+        "schedule": int(os.getenv("UPLOAD_REAPER_INTERVAL", 300)),
+    },
+}
+
+# ✅ CELERY WORKER PROFILES (CELERY_WORKER_PROFILE)
+# prefork: CPU-bound work (thumbnails, hashing), one process per core
+# threads: I/O-bound work like SMTP on the otp queue
+# gevent:  many concurrent I/O waits per process (needs gevent installed);
+#          start it as `celery -A config worker -P gevent` so Celery
+#          monkey-patches first; the worker refuses to start unpatched
+# solo:    Windows development, one task at a time
+WORKER_PROFILES = {
+    "prefork": {"worker_pool": "prefork", "worker_concurrency": os.cpu_count() or 1},
+    "threads": {"worker_pool": "threads", "worker_concurrency": 8},
+    "gevent": {"worker_pool": "gevent", "worker_concurrency": 100},
+    "solo": {"worker_pool": "solo", "worker_concurrency": 1},
+}
+
+CELERY_WORKER_PROFILE = os.getenv(
+    "CELERY_WORKER_PROFILE", "solo" if os.name == "nt" else "prefork"
+)
+if CELERY_WORKER_PROFILE not in WORKER_PROFILES:
+    raise ValueError(
+        f"Unknown CELERY_WORKER_PROFILE {CELERY_WORKER_PROFILE!r}; "
+        f"expected one of {', '.join(WORKER_PROFILES)}"
+    )
+
+CELERY_WORKER_POOL = WORKER_PROFILES[CELERY_WORKER_PROFILE]["worker_pool"]
+CELERY_WORKER_CONCURRENCY = int(
+    os.getenv(
+        "CELERY_WORKER_CONCURRENCY",
+        WORKER_PROFILES[CELERY_WORKER_PROFILE]["worker_concurrency"],
+    )
+)
+
 # ✅ EMAIL
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = os.getenv("EMAIL_HOST")
@@ -103,6 +234,13 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
 
+# outbox drained in batches over one persistent SMTP connection per worker
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", 50))
+MAIL_DRAIN_TIME_BUDGET = float(os.getenv("MAIL_DRAIN_TIME_BUDGET", 10))
+MAIL_CONNECTION_MAX_AGE = float(os.getenv("MAIL_CONNECTION_MAX_AGE", 300))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 3))
+MAIL_RETRY_DELAY = int(os.getenv("MAIL_RETRY_DELAY", 15))
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
@@ -114,13 +252,45 @@ SPECTACULAR_SETTINGS = {
     "SERVE_INCLUDE_SCHEMA": False,
 }
 
+# ✅ PROTECTED MEDIA (accounts.downloads)
+# who sends authorized downloads: "nginx" (X-Accel-Redirect), "sendfile"
+# (X-Sendfile: Apache mod_xsendfile, lighttpd) or "" for Django itself
+PROTECTED_MEDIA_SERVER = os.getenv("PROTECTED_MEDIA_SERVER", "")
+if PROTECTED_MEDIA_SERVER not in ("", "nginx", "sendfile"):
+    raise ValueError(
+        f"Unknown PROTECTED_MEDIA_SERVER {PROTECTED_MEDIA_SERVER!r}; "
+        "use nginx, sendfile or leave it empty"
+    )
+# nginx `internal` location aliasing MEDIA_ROOT
+PROTECTED_MEDIA_PREFIX = os.getenv("PROTECTED_MEDIA_PREFIX", "/protected-media/")
+
+# ✅ API SCHEMA
+# rendered by `manage.py build_schema` and served as a static, gzipped file
+SCHEMA_FILE = os.getenv("SCHEMA_FILE", str(BASE_DIR / "openapi.json.gz"))
+SCHEMA_CACHE_MAX_AGE = int(os.getenv("SCHEMA_CACHE_MAX_AGE", 86400))
+
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_SCHEMA_CLASS": ("drf_spectacular.openapi.AutoSchema"),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    # accounts.throttling sliding windows; every OTP costs a hash and an email
+    "DEFAULT_THROTTLE_RATES": {
+        "register_ip": "20/hour",
+        "register_email": "5/hour",
+        "login_ip": "30/min",
+        "login_email": "10/hour",
+        "verify_otp_ip": "30/min",
+        "verify_otp": "5/min",
+        "verify_login_otp_ip": "30/min",
+        "verify_login_otp": "5/min",
+        # typeahead on the signup form, a few lookups per field
+        "availability_ip": "60/min",
+    },
+    # proxies in front of the app; their X-Forwarded-For entries are trusted
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES")) if os.getenv("NUM_PROXIES") else None,
 }
 
 
@@ -128,6 +298,15 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
-    "BLACKLIST_AFTER_ROTATION": True,
+    # rotation and revocation are tracked in Redis (accounts.token_families)
+    "BLACKLIST_AFTER_ROTATION": False,
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
+
+# rows for tokens whose claims went stale (role / approval changed)
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", 1024))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", 30))
+
+# ✅ METRICS
+# /metrics is open when unset; otherwise scrapers send "Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
@@ -16,11 +16,23 @@ Including another URLconf
 """
 
 from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
+from django.views.decorators.cache import cache_control
+from accounts.views import metrics_view, schema_view, swagger_view
 
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/auth/", include("accounts.urls")),
+    path("metrics", metrics_view),
+    path("api/schema/", schema_view, name="schema"),
+    path(
+        "api/docs/",
+        cache_control(public=True, max_age=settings.SCHEMA_CACHE_MAX_AGE)(
+            swagger_view
+        ),
+        name="swagger-ui",
+    ),
 
 ]
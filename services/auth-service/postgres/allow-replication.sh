@@ -0,0 +1,5 @@
+#!/bin/sh
+# Lets the postgres-replica service stream WAL from this server.
+# Only runs when the data volume is first initialised.
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"